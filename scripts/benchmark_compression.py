@@ -0,0 +1,97 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import faiss
+import numpy as np
+from embeddings.vector_store import FAISSVectorStore
+
+
+def synthetic_embeddings(
+        num_vectors: int,
+        dim: int,
+        rng: np.random.Generator,
+        latent_dim: int = 64,
+        mean_offset: float = 0.0
+) -> np.ndarray:
+    # Generating unit vectors with low intrinsic dimension (like sentence embeddings), since isotropic random vectors make PCA meaningless.
+    # A non-zero mean_offset adds a component shared by every vector, as real sentence embeddings have a non-zero mean.
+    basis = rng.standard_normal((latent_dim, dim)).astype('float32')
+    vectors = rng.standard_normal((num_vectors, latent_dim)).astype('float32') @ basis
+    vectors += 0.1 * rng.standard_normal((num_vectors, dim)).astype('float32')
+    vectors += mean_offset * np.sqrt(latent_dim) * rng.standard_normal(dim).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def evaluate(store: FAISSVectorStore, queries: np.ndarray, truth: np.ndarray, top_k: int):
+    # Returning (QPS, recall@k) of single-query searches against exact ground truth.
+    found = []
+    start = time.perf_counter()
+    for query in queries:
+        found.append([r["faq"]["id"] for r in store.search(query, top_k=top_k)])
+    qps = len(queries) / (time.perf_counter() - start)
+    recall = np.mean([len(set(f) & set(t)) / top_k for f, t in zip(found, truth)])
+    return qps, recall
+
+
+def main():
+    # Comparing bytes per vector, QPS and recall@k of the compressed storage formats against the float32 IndexFlatIP baseline.
+    parser = argparse.ArgumentParser(description="Benchmark compressed vector storage formats")
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--mean-offset", type=float, default=1.0, help="Shared mean component of the second synthetic dataset")
+    parser.add_argument("--embeddings", type=Path, help="Optional .npy file of real embeddings to use instead of synthetic ones")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    datasets = []
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype('float32')
+        queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+        queries = queries + 0.05 * rng.standard_normal(queries.shape).astype('float32')
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        datasets.append((args.embeddings.name, vectors, queries))
+    else:
+        # Zero-mean data hides mistakes in how PCA centers queries, so a shared-mean dataset is always measured too
+        for name, mean_offset in (("zero-mean", 0.0), ("shared-mean", args.mean_offset)):
+            data = synthetic_embeddings(args.size + args.queries, args.dim, rng, mean_offset=mean_offset)
+            datasets.append((name, data[:args.size], data[args.size:]))
+
+    configs = [
+        ("float32", "none", 0, 1),
+        ("fp16", "fp16", 0, 1),
+        ("int8", "int8", 0, 1),
+        ("int8+rescore", "int8", 0, 4),
+        ("pca128+fp16", "fp16", 128, 1),
+        ("pca128+int8", "int8", 128, 1),
+        ("pca128+int8+rescore", "int8", 128, 4),
+    ]
+    results = []
+    for dataset, vectors, queries in datasets:
+        metadata = [{"id": i} for i in range(len(vectors))]
+
+        # Exact ground truth from brute-force float32 search
+        flat = faiss.IndexFlatIP(vectors.shape[1])
+        flat.add(vectors)
+        _, truth = flat.search(queries, args.top_k)
+
+        for label, compression, pca_dim, rescore_factor in configs:
+            store = FAISSVectorStore(vectors.shape[1], compression=compression, pca_dim=pca_dim, rescore_factor=rescore_factor)
+            store.add_vectors(vectors, metadata)
+            bytes_per_vector = len(faiss.serialize_index(store.index)) / len(vectors)
+            qps, recall = evaluate(store, queries, truth, args.top_k)
+            results.append((dataset, label, bytes_per_vector, qps, recall))
+
+    print("\n" + "=" * 60)
+    print(f"{'dataset':>12} {'format':>20} {'bytes/vector':>13} {'QPS':>9} {f'recall@{args.top_k}':>10}")
+    for dataset, label, bytes_per_vector, qps, recall in results:
+        print(f"{dataset:>12} {label:>20} {bytes_per_vector:>13.1f} {qps:>9.1f} {recall:>10.3f}")
+    print("(re-scoring also reads float32 vectors from a memory-mapped vectors.npy, not counted in bytes/vector)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
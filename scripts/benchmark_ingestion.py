@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from config import EMBEDDING_MODEL
+from embeddings.embedder import FAQEmbedder
+from embeddings.vector_store import FAISSVectorStore
+from utils.ingestion import ingest_sources
+
+
+def write_corpus(directory: Path, num_docs: int, num_files: int = 4):
+    # Writing a synthetic help-center corpus split across JSONL files, sized like real support articles.
+    words = "domain transfer renewal nameserver whois registrant redemption auth code provider expired suspended".split()
+    for file_index in range(num_files):
+        with open(directory / f"articles_{file_index}.jsonl", 'w', encoding='utf-8') as f:
+            for i in range(file_index, num_docs, num_files):
+                body = " ".join(words[(i + j) % len(words)] for j in range(120))
+                f.write(json.dumps({"title": f"Article {i}: {words[i % len(words)]}", "body": body}) + "\n")
+
+
+def main():
+    # Measuring ingestion throughput (docs/sec) and peak RSS as the number of encode worker processes grows.
+    parser = argparse.ArgumentParser(description="Benchmark streaming KB ingestion by worker count")
+    parser.add_argument("--docs", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    embedder = FAQEmbedder(args.model)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(Path(tmp), args.docs)
+        for workers in args.workers:
+            store = FAISSVectorStore(embedding_dim=embedder.embedding_dim)
+            stats = ingest_sources(
+                store, [os.path.join(tmp, "*.jsonl")], embedder=embedder, workers=workers,
+                chunk_size=args.chunk_size, model_name=args.model
+            )
+            results.append((workers, stats["docs_per_sec"]))
+
+    peak_parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    peak_child = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print("\n" + "=" * 60)
+    print(f"{os.cpu_count()} CPU cores, {args.docs} documents, chunks of {args.chunk_size}")
+    print(f"{'workers':>8} {'docs/sec':>10} {'speedup':>8}")
+    for workers, docs_per_sec in results:
+        print(f"{workers:>8} {docs_per_sec:>10.1f} {docs_per_sec / results[0][1]:>7.2f}x")
+    print(f"Peak RSS: parent {peak_parent:.0f} MB, largest worker {peak_child:.0f} MB")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from utils.data_loader import load_canonical_faqs
+from embeddings.embedder import FAQEmbedder
+from embeddings.vector_store import FAISSVectorStore
+from llm.ollama_client import TucowsSupportLLM
+from api.pipeline import run_pipeline
+
+
+def main():
+    # Replaying canonical questions through the pipeline with legacy free-form JSON (no repair, the real "before" fallback rate) and with schema-constrained output, then comparing tokens generated, fallback rate and latency.
+    parser = argparse.ArgumentParser(description="Compare legacy and schema-constrained LLM generation (requires a running Ollama server)")
+    parser.add_argument("--limit", type=int, default=20, help="Number of canonical questions to replay")
+    parser.add_argument("--debug", action="store_true", help="Also generate reasoning_trace in structured mode")
+    args = parser.parse_args()
+
+    questions = [faq["question"] for faq in load_canonical_faqs()][:args.limit]
+    embedder = FAQEmbedder()
+    vector_store = FAISSVectorStore(embedding_dim=embedder.embedding_dim)
+    vector_store.load_index()
+
+    results = []
+    for label, structured, debug in (("legacy", False, True), ("structured", True, args.debug)):
+        llm_client = TucowsSupportLLM(structured_output=structured)
+        start = time.perf_counter()
+        for question in questions:
+            run_pipeline(question, embedder, vector_store, llm_client, debug=debug)
+        elapsed = time.perf_counter() - start
+        results.append((label, llm_client.get_stats(), elapsed / len(questions)))
+
+    print("\n" + "=" * 60)
+    print(f"{'mode':>12} {'tokens/req':>12} {'fallback rate':>15} {'repaired':>10} {'retries':>9} {'s/req':>8}")
+    for label, stats, latency in results:
+        print(f"{label:>12} {stats['avg_tokens_generated']:>12.1f} {stats['fallback_rate']:>15.2%} {stats['repaired']:>10} {stats['retries']:>9} {latency:>8.2f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
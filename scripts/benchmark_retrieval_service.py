@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import numpy as np
+from config import EMBEDDING_MODEL
+from embeddings.embedder import FAQEmbedder
+from embeddings.vector_store import FAISSVectorStore
+from embeddings.retrieval_service import RetrievalService, RetrievalClient, RemoteEmbedder, RemoteVectorStore
+
+QUERY_WORDS = "domain transfer renewal nameserver whois expired suspended auth code provider refund privacy".split()
+
+
+def peak_rss_mb(pid: str = "self") -> float:
+    # Reading the peak resident set size (VmHWM) of a process from /proc.
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build_store(dim: int, corpus: int) -> FAISSVectorStore:
+    # Building a synthetic index of the requested size (the same in every process, seeded).
+    vectors = np.random.default_rng(0).standard_normal((corpus, dim)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store = FAISSVectorStore(embedding_dim=dim)
+    store.add_vectors(vectors, [{"question": f"q{i}", "answer": ""} for i in range(corpus)])
+    return store
+
+
+def run_sidecar(model: str, corpus: int, socket_path: str):
+    embedder = FAQEmbedder(model)
+    asyncio.run(RetrievalService(embedder, build_store(embedder.embedding_dim, corpus)).serve(socket_path))
+
+
+def run_worker(mode: str, model: str, corpus: int, socket_path: str, num_queries: int, barrier, results):
+    # Simulating one API worker: setting up retrieval in the given mode, then embedding and searching tickets back to back.
+    if mode == "sidecar":
+        client = RetrievalClient(socket_path)
+        embedder, store = RemoteEmbedder(client), RemoteVectorStore(client)
+    else:
+        embedder = FAQEmbedder(model)
+        store = build_store(embedder.embedding_dim, corpus)
+
+    rng = np.random.default_rng(os.getpid())
+    tickets = [" ".join(rng.choice(QUERY_WORDS, 12)) for _ in range(num_queries)]
+    barrier.wait()
+    for ticket in tickets:
+        store.search(embedder.embed_query(ticket), top_k=3)
+    results.put(peak_rss_mb())
+
+
+def main():
+    # Comparing total RSS and retrieval throughput of in-process retrieval vs one shared sidecar at several worker counts.
+    parser = argparse.ArgumentParser(description="Benchmark in-process vs sidecar retrieval across API worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--queries", type=int, default=200, help="Queries per worker")
+    parser.add_argument("--corpus", type=int, default=50_000)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for mode in ("inprocess", "sidecar"):
+        for workers in args.workers:
+            socket_path = os.path.join(tempfile.mkdtemp(), "retrieval.sock")
+            sidecar = None
+            if mode == "sidecar":
+                sidecar = context.Process(target=run_sidecar, args=(args.model, args.corpus, socket_path), daemon=True)
+                sidecar.start()
+
+            barrier, results = context.Barrier(workers + 1), context.Queue()
+            processes = [
+                context.Process(target=run_worker, args=(mode, args.model, args.corpus, socket_path, args.queries, barrier, results))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            barrier.wait()
+            start = time.perf_counter()
+            worker_rss = [results.get() for _ in processes]
+            elapsed = time.perf_counter() - start
+            for process in processes:
+                process.join()
+
+            total_rss = sum(worker_rss)
+            if sidecar is not None:
+                total_rss += peak_rss_mb(str(sidecar.pid))
+                sidecar.terminate()
+                sidecar.join()
+            rows.append((mode, workers, total_rss, workers * args.queries / elapsed))
+
+    print("\n" + "=" * 60)
+    print(f"{os.cpu_count()} CPU cores, {args.corpus} vectors, {args.queries} queries per worker")
+    print(f"{'mode':>10} {'workers':>8} {'total RSS MB':>13} {'queries/sec':>12}")
+    for mode, workers, total_rss, qps in rows:
+        print(f"{mode:>10} {workers:>8} {total_rss:>13.0f} {qps:>12.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
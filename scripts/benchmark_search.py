@@ -0,0 +1,62 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import numpy as np
+from embeddings.vector_store import FAISSVectorStore
+
+CATEGORIES = ["domain_management", "renewals_and_redemptions", "transfers", "data_use", "top_questions"]
+
+
+def build_store(num_vectors: int, dim: int, rng: np.random.Generator) -> FAISSVectorStore:
+    # Building a store of random unit vectors with round-robin categories (synthetic stand-in for a large FAQ corpus).
+    vectors = rng.standard_normal((num_vectors, dim)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadata = [{"question": f"q{i}", "answer": "", "category": CATEGORIES[i % len(CATEGORIES)]} for i in range(num_vectors)]
+    store = FAISSVectorStore(embedding_dim=dim)
+    store.add_vectors(vectors, metadata)
+    return store
+
+
+def time_searches(store: FAISSVectorStore, queries: np.ndarray, top_k: int, filters=None) -> float:
+    # Returning the mean per-query latency in milliseconds.
+    start = time.perf_counter()
+    for query in queries:
+        store.search(query, top_k=top_k, filters=filters)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    # Comparing unfiltered search against single-category and multi-category filtered search at increasing corpus sizes.
+    parser = argparse.ArgumentParser(description="Benchmark filtered vs unfiltered FAISS search latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim)).astype('float32')
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    results = []
+    for size in args.sizes:
+        store = build_store(size, args.dim, rng)
+        store.search(queries[0], top_k=args.top_k, filters={"category": "transfers"})  # Warming the filter cache
+        results.append((
+            size,
+            time_searches(store, queries, args.top_k),
+            time_searches(store, queries, args.top_k, {"category": "transfers"}),
+            time_searches(store, queries, args.top_k, {"category": ["transfers", "data_use"]}),
+        ))
+
+    print("\n" + "=" * 60)
+    print(f"{'vectors':>10} {'unfiltered ms':>15} {'1 category ms':>15} {'2 categories ms':>17}")
+    for size, unfiltered, single, double in results:
+        print(f"{size:>10} {unfiltered:>15.3f} {single:>15.3f} {double:>17.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
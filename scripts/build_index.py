@@ -1,40 +1,84 @@
+import argparse
 import sys
 from pathlib import Path
+from typing import List
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-from utils.data_loader import load_all_faqs, prepare_faq_texts
+from utils.data_loader import load_canonical_faqs
+from utils.ingestion import ingest_sources
+from utils.answer_store import PrecomputedAnswerStore
 from embeddings.embedder import FAQEmbedder
 from embeddings.vector_store import FAISSVectorStore
+from llm.ollama_client import TucowsSupportLLM
+from api.pipeline import precompute_answer
+from config import VECTOR_COMPRESSION, VECTOR_PCA_DIM, KB_SOURCES, INGEST_WORKERS, INGEST_CHUNK_SIZE
+
+
+def precompute_answers(embedder: FAQEmbedder, vector_store: FAISSVectorStore, sources: List[str]):
+    # Running the full RAG pipeline for every canonical question and storing the validated responses, tagged with the index version.
+    llm_client = TucowsSupportLLM()
+    answer_store = PrecomputedAnswerStore()
+    answer_store.set_canonical_faqs(load_canonical_faqs(sources))
+    answer_store.refresh(
+        vector_store.index_version,
+        lambda question: precompute_answer(question, embedder, vector_store, llm_client),
+        force=True
+    )
+    answer_store.save()
 
 
 def main():
     # Loading FAQ data and building FAISS index by extracting only the relevant fields for similarity search.
+    parser = argparse.ArgumentParser(description="Build the FAISS index for the Tucows Knowledge Assistant")
+    parser.add_argument(
+        "--precompute-answers",
+        action="store_true",
+        help="Also generate answers for all canonical questions (requires a running Ollama server)"
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["none", "fp16", "int8"],
+        default=VECTOR_COMPRESSION,
+        help="Vector storage format: exact float32, or fp16/int8 scalar quantization"
+    )
+    parser.add_argument(
+        "--pca-dim",
+        type=int,
+        default=VECTOR_PCA_DIM,
+        help="Reduce vectors to this many dimensions with PCA before storage (0 keeps all dimensions)"
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=KB_SOURCES,
+        help="Glob patterns of JSON/JSONL knowledge base files, relative to the repository root"
+    )
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Embedding worker processes")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Documents embedded per chunk")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Building FAISS Index for Tucows Knowledge Assistant")
     print("=" * 60)
 
-    # Loading FAQ data
-    print("\nLoading FAQ data...")
-    faqs = load_all_faqs()
-    texts = prepare_faq_texts(faqs)
+    # Streaming FAQ sources through the all-MiniLM-L6-v2 model in fixed-size chunks, converting each text into a vector of size 384 (the embedding dimension) and adding every chunk to the FAISS index as it completes.
+    print("\nIngesting FAQ data...")
+    embedder = FAQEmbedder()
+    vector_store = FAISSVectorStore(embedding_dim=embedder.embedding_dim, compression=args.compression, pca_dim=args.pca_dim)
+    ingest_sources(vector_store, args.sources, embedder=embedder, workers=args.workers, chunk_size=args.chunk_size)
 
-    if not faqs:
+    if not vector_store.metadata:
         print("Error: No FAQs loaded. Check data directory.")
         return
 
-    # Generating embeddings for all FAQ data using all-MiniLM-L6-v2 model to convert each text into a numerical vector of size 384 (the embedding dimension). Example: If we have 100 FAQs, we will get a (100, 384) NumPy array of embeddings.
-    print("\nGenerating embeddings...")
-    embedder = FAQEmbedder()
-    embeddings = embedder.embed_texts(texts)
-
-    # Initializing FAISS vector store and adding embeddings with metadata
-    print("\nBuilding FAISS index...")
-    vector_store = FAISSVectorStore(embedding_dim=embedder.embedding_dim)
-    vector_store.add_vectors(embeddings, faqs)
-
     # Saving the FAISS index and metadata to disk for future use
     print("\nSaving index...")
     vector_store.save_index()
 
+    # Optionally precomputing answers for canonical questions so they can be served without calling the LLM
+    if args.precompute_answers:
+        print("\nPrecomputing answers for canonical questions...")
+        precompute_answers(embedder, vector_store, args.sources)
+
     print("\n" + "=" * 60)
     print("FAISS index has been created successfully!")
     print("=" * 60)
@@ -1,45 +1,93 @@
 # FastAPI application for the Tucows Knowledge Assistant with frontend.
+import asyncio
+import hmac
 import json
 import os
 import os as _os
-from fastapi import FastAPI, Request, HTTPException, Query
+import random
+import re
+import threading
+from fastapi import FastAPI, Request, HTTPException, Query, Header
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
-from .response_models import TicketRequest, TicketResponse
+from .response_models import TicketRequest, TicketResponse, ProfilingSettings
+from .pipeline import run_pipeline, precompute_answer, NoMatchingFAQsError
 from embeddings.embedder import FAQEmbedder
 from embeddings.vector_store import FAISSVectorStore
+from embeddings.retrieval_service import RetrievalClient, RemoteEmbedder, RemoteVectorStore
 from llm.ollama_client import TucowsSupportLLM
-from utils.confidence import calculate_confidence, should_escalate
-from config import TOP_K_RETRIEVAL, CONFIDENCE_THRESHOLD, STATIC_DIR
+from utils.answer_store import PrecomputedAnswerStore
+from utils.data_loader import load_canonical_faqs
+from utils.profiler import SamplingProfiler, write_folded
+from utils.tracing import (
+    TRACE_HEADER, new_trace_id, start_trace, end_trace, tracing_enabled, set_tracing_enabled
+)
+from config import (
+    PRECOMPUTED_ANSWERS_ENABLED, RETRIEVAL_MODE, STATIC_DIR, ADMIN_TOKEN, PROFILING_SAMPLE_RATE, PROFILING_INTERVAL_MS, PROFILE_DIR
+)
 
 # Global instances
 embedder: FAQEmbedder = None
 vector_store: FAISSVectorStore = None
 llm_client: TucowsSupportLLM = None
+answer_store: PrecomputedAnswerStore = None
+profiling_sample_rate: float = PROFILING_SAMPLE_RATE
+
+# Trace IDs from clients are also used as profile file names, so only simple IDs are accepted
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _refresh_stale_answers(store: PrecomputedAnswerStore, index_version: str):
+    # Regenerating precomputed answers whose FAQ or index changed since they were built (runs in a background thread).
+    # Every uvicorn worker runs lifespan, so one of them regenerates and the others reload its results once it is done.
+    # A separate LLM client keeps offline regeneration out of the request stats reported by /admin/llm-stats.
+    refresh_llm_client = TucowsSupportLLM()
+    store.refresh_and_save(
+        index_version,
+        lambda question: precompute_answer(question, embedder, vector_store, refresh_llm_client),
+        include_missing=False
+    )
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global embedder, vector_store, llm_client
+    global embedder, vector_store, llm_client, answer_store
 
     print("Starting Tucows Domains Knowledge Assistant...")
 
-    # Loading embedding model
-    embedder = FAQEmbedder()
-
-    # Loading FAISS index
-    vector_store = FAISSVectorStore(embedding_dim=embedder.embedding_dim)
-    try:
-        vector_store.load_index()
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
-        print("Run 'python scripts/build_index.py' first!")
-        raise
+    if RETRIEVAL_MODE == "sidecar":
+        # Using the shared retrieval service instead of loading the model and index in every worker
+        client = RetrievalClient()
+        embedder = RemoteEmbedder(client)
+        vector_store = RemoteVectorStore(client)
+        print(f"Connected to retrieval service ({client.info['ntotal']} vectors)")
+    else:
+        # Loading embedding model
+        embedder = FAQEmbedder()
+
+        # Loading FAISS index
+        vector_store = FAISSVectorStore(embedding_dim=embedder.embedding_dim)
+        try:
+            vector_store.load_index()
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            print("Run 'python scripts/build_index.py' first!")
+            raise
 
     # Load Ollama LLM client
     llm_client = TucowsSupportLLM()
+
+    # Loading precomputed answers and regenerating stale ones in the background
+    if PRECOMPUTED_ANSWERS_ENABLED:
+        answer_store = PrecomputedAnswerStore()
+        answer_store.load()
+        answer_store.set_canonical_faqs(load_canonical_faqs())
+        index_version = vector_store.index_version
+        if answer_store.stale_questions(index_version, include_missing=False):
+            threading.Thread(target=_refresh_stale_answers, args=(answer_store, index_version), daemon=True).start()
     print("Ready to process tickets!\n")
 
     yield
@@ -62,6 +110,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _finish_profile(profiler: SamplingProfiler, trace_id: str):
+    # Stopping the profiler (a thread join) and writing its stacks; run off the event loop so other requests are not blocked.
+    stacks = profiler.stop()
+    if stacks:
+        profile_path = PROFILE_DIR / f"{trace_id}.folded"
+        write_folded(stacks, profile_path)
+        print(f"[PROFILE] Wrote {profile_path}")
+
+
+# Tracing every request (when enabled) and running the sampling profiler on a share of them
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    trace_id = request.headers.get(TRACE_HEADER, "")
+    if not _VALID_TRACE_ID.match(trace_id):
+        trace_id = new_trace_id()
+
+    trace = start_trace(trace_id)
+    profiler = None
+    if profiling_sample_rate > 0 and random.random() < profiling_sample_rate:
+        profiler = SamplingProfiler(threading.get_ident(), PROFILING_INTERVAL_MS)
+        profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiler is not None:
+            await asyncio.get_running_loop().run_in_executor(None, _finish_profile, profiler, trace_id)
+        end_trace()
+
+    response.headers[TRACE_HEADER] = trace_id
+    if trace is not None:
+        print(f"[TRACE] {trace.summary()}")
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
 # Serving frontend
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
@@ -76,42 +158,24 @@ async def resolve_ticket(
         debug: bool = Query(False, description="Include reasoning_trace in response")
 ) -> TicketResponse:
     try:
-        # Step 1: Embedding query
-        query_embedding = embedder.embed_query(request.ticket_text)
-
-        # Step 2: Retrieving top-K FAQs
-        retrieved_faqs = vector_store.search(query_embedding, top_k=TOP_K_RETRIEVAL)
-        if not retrieved_faqs:
-            raise HTTPException(status_code=500, detail="No FAQs retrieved. Index may be empty.")
-
-        # Step 3: Generating LLM response using Ollama
-        llm_response = llm_client.generate_response(request.ticket_text, retrieved_faqs)
-
-        # Validating and ensuring required keys exist before any downstream uses
-        if not isinstance(llm_response, dict):
-            raise HTTPException(status_code=500, detail="Invalid LLM response format")
-
-        llm_response.setdefault("answer", "No answer generated.")
-        llm_response.setdefault("references", [])
-        llm_response.setdefault("action_required", "none")
-        llm_response.setdefault("reasoning_trace", None)
-
-        # Step 4: Calculating confidnce (based on similarity scores)
-        similarity_scores = [r.get('similarity_score', 0.0) for r in retrieved_faqs]
-        confidence = calculate_confidence(similarity_scores, llm_response, len(retrieved_faqs))
-
-        # Step 5: Determining action required safely
-        action = should_escalate(confidence, llm_response["action_required"], CONFIDENCE_THRESHOLD)
-
-        # Building the response
-        return TicketResponse(
-            answer=llm_response["answer"],
-            references=llm_response["references"],
-            action_required=action,
-            confidence_score=confidence,
-            reasoning_trace=llm_response.get("reasoning_trace") if debug else None
-        )
-
+        # Answering near-exact canonical questions from the precomputed store (debug requests need a live reasoning trace)
+        if answer_store is not None and not request.filters and not debug:
+            precomputed = answer_store.lookup(request.ticket_text)
+            if precomputed is not None:
+                precomputed["reasoning_trace"] = None
+                return TicketResponse(**precomputed)
+
+        # Running the RAG pipeline (embed, retrieve, generate, score)
+        response = run_pipeline(request.ticket_text, embedder, vector_store, llm_client, request.filters, debug)
+        response["reasoning_trace"] = response.get("reasoning_trace") if debug else None
+        return TicketResponse(**response)
+
+    except NoMatchingFAQsError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (TimeoutError, ConnectionError) as e:
+        # Retrieval sidecar unavailable or not responding
+        print(f"Error processing ticket: {e}")
+        raise HTTPException(status_code=503, detail=f"Retrieval service unavailable: {str(e)}")
     except Exception as e:
         print(f"Error processing ticket: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process ticket: {str(e)}")
@@ -127,12 +191,48 @@ async def api_ask(request: Request):
             raise HTTPException(status_code=400, detail="Missing query field")
 
         ticket_request = TicketRequest(ticket_text=query)
-        response = await resolve_ticket(ticket_request)
+        response = await resolve_ticket(ticket_request, debug=False)
         return response
 
+    except HTTPException:
+        raise
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
     except Exception as e:
         print(f"Error in /api/ask: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _require_admin(token: str):
+    # Allowing admin endpoints only with the configured token (and not at all when no token is configured).
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/profiling", response_model=ProfilingSettings)
+async def get_profiling(x_admin_token: str = Header("")):
+    _require_admin(x_admin_token)
+    return ProfilingSettings(tracing_enabled=tracing_enabled(), sample_rate=profiling_sample_rate)
+
+
+@app.post("/admin/profiling", response_model=ProfilingSettings)
+async def update_profiling(settings: ProfilingSettings, x_admin_token: str = Header("")):
+    # Switching tracing and the sampling profiler at runtime; profiles are written to PROFILE_DIR as <trace_id>.folded.
+    # Settings are per process: with several uvicorn workers, only the worker that handled this request is changed.
+    global profiling_sample_rate
+    _require_admin(x_admin_token)
+    if settings.tracing_enabled is not None:
+        set_tracing_enabled(settings.tracing_enabled)
+    if settings.sample_rate is not None:
+        profiling_sample_rate = settings.sample_rate
+    print(f"[ADMIN] Tracing: {tracing_enabled()}, profiling sample rate: {profiling_sample_rate}")
+    return ProfilingSettings(tracing_enabled=tracing_enabled(), sample_rate=profiling_sample_rate)
+
+
+@app.get("/admin/llm-stats")
+async def get_llm_stats(x_admin_token: str = Header("")):
+    # Reporting tokens generated per request and the fallback rate since startup (for the worker that handled this request).
+    _require_admin(x_admin_token)
+    return llm_client.get_stats()
@@ -0,0 +1,109 @@
+# RAG pipeline shared by the API endpoints and the offline answer precomputation in scripts/build_index.py.
+from typing import Dict, List, Optional, Union
+from embeddings.embedder import FAQEmbedder
+from embeddings.vector_store import FAISSVectorStore
+from llm.ollama_client import TucowsSupportLLM
+from utils.confidence import calculate_confidence, should_escalate
+from utils.category_router import build_category_filters
+from utils.tracing import span
+from config import TOP_K_RETRIEVAL, CONFIDENCE_THRESHOLD, CATEGORY_ROUTING_ENABLED
+from .response_models import TicketResponse
+
+
+class NoMatchingFAQsError(LookupError):
+    # Raised when explicit caller filters match no FAQs (a client error, unlike an empty index).
+    pass
+
+
+def retrieve_faqs(
+        ticket_text: str,
+        query_embedding,
+        vector_store: FAISSVectorStore,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None
+) -> List[Dict]:
+    # Retrieving top-K FAQs (explicit filters are strict, routed categories fall back to a full search).
+    if filters:
+        retrieved_faqs = vector_store.search(query_embedding, top_k=TOP_K_RETRIEVAL, filters=filters)
+        if not retrieved_faqs:
+            raise NoMatchingFAQsError(f"No FAQs matched filters: {filters}")
+        return retrieved_faqs
+
+    routed_filters = build_category_filters(ticket_text) if CATEGORY_ROUTING_ENABLED else {}
+    retrieved_faqs = vector_store.search(query_embedding, top_k=TOP_K_RETRIEVAL, filters=routed_filters)
+    if len(retrieved_faqs) < TOP_K_RETRIEVAL and routed_filters:
+        retrieved_faqs = vector_store.search(query_embedding, top_k=TOP_K_RETRIEVAL)
+    if not retrieved_faqs:
+        raise LookupError("No FAQs retrieved. Index may be empty.")
+    return retrieved_faqs
+
+
+def run_pipeline(
+        ticket_text: str,
+        embedder: FAQEmbedder,
+        vector_store: FAISSVectorStore,
+        llm_client: TucowsSupportLLM,
+        filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+        debug: bool = False
+) -> Dict:
+    # Running embed -> retrieve -> generate -> score for one ticket and returning the MCP response fields as a dict.
+    # reasoning_trace is only generated in debug mode, since it is discarded otherwise.
+
+    # Step 1: Embedding query
+    with span("pipeline.embed"):
+        query_embedding = embedder.embed_query(ticket_text)
+
+    # Step 2: Retrieving top-K FAQs
+    with span("pipeline.retrieve"):
+        retrieved_faqs = retrieve_faqs(ticket_text, query_embedding, vector_store, filters)
+
+    # Step 3: Generating LLM response using Ollama
+    with span("pipeline.generate"):
+        llm_response = llm_client.generate_response(ticket_text, retrieved_faqs, include_reasoning=debug)
+
+    # Validating and ensuring required keys exist before any downstream uses
+    if not isinstance(llm_response, dict):
+        raise ValueError("Invalid LLM response format")
+
+    llm_response.setdefault("answer", "No answer generated.")
+    llm_response.setdefault("references", [])
+    llm_response.setdefault("action_required", "none")
+    llm_response.setdefault("reasoning_trace", None)
+
+    # Step 4: Calculating confidnce (based on similarity scores)
+    similarity_scores = [r.get('similarity_score', 0.0) for r in retrieved_faqs]
+    confidence = calculate_confidence(similarity_scores, llm_response, len(retrieved_faqs))
+
+    # Step 5: Determining action required safely
+    action = should_escalate(confidence, llm_response["action_required"], CONFIDENCE_THRESHOLD)
+
+    return {
+        "answer": llm_response["answer"],
+        "references": llm_response["references"],
+        "action_required": action,
+        "confidence_score": confidence,
+        "reasoning_trace": llm_response.get("reasoning_trace"),
+        # Whether the LLM output had to be repaired (not part of the API response; used to keep such answers out of the answer store)
+        "repaired": bool(llm_response.get("repaired"))
+    }
+
+
+def precompute_answer(
+        question: str,
+        embedder: FAQEmbedder,
+        vector_store: FAISSVectorStore,
+        llm_client: TucowsSupportLLM
+) -> Optional[Dict]:
+    # Running the full pipeline for a canonical question and returning the response only if it is a valid MCP response that
+    # was neither a fallback nor repaired from malformed or truncated output.
+    try:
+        response = run_pipeline(question, embedder, vector_store, llm_client)
+    except Exception as e:
+        print(f"[ANSWERS] Pipeline failed for '{question[:60]}': {e}")
+        return None
+
+    if str(response.get("reasoning_trace") or "").startswith("LLM error"):
+        return None
+    if response.get("repaired"):
+        print(f"[ANSWERS] Skipping repaired LLM output for '{question[:60]}'")
+        return None
+    return TicketResponse(**response).model_dump()
@@ -1,6 +1,7 @@
 # Using Pydantic to define request and response models.
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Optional, Union
+from config import FILTER_FIELDS
 
 
 class TicketRequest(BaseModel):
@@ -12,6 +13,34 @@ class TicketRequest(BaseModel):
         max_length=2000,
         example="My domain was suspended and I didn't get any notice. How can I reactivate it?"
     )
+    filters: Optional[Dict[str, Union[str, List[str]]]] = Field(
+        None,
+        description="Optional metadata filters applied before retrieval (a list value matches any entry)",
+        example={"category": ["transfers"]}
+    )
+
+    @field_validator("filters")
+    @classmethod
+    def check_filter_fields(cls, filters):
+        # Rejecting filters on fields that are not indexed for filtering (answered with 422 like other validation errors).
+        unknown = sorted(set(filters or {}) - set(FILTER_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown filter field(s) {unknown}; allowed: {list(FILTER_FIELDS)}")
+        return filters
+
+
+class ProfilingSettings(BaseModel):
+    # Admin-controlled tracing and profiling settings (omitted fields are left unchanged).
+    tracing_enabled: Optional[bool] = Field(
+        None,
+        description="Record per-request timing spans and return them in the Server-Timing header"
+    )
+    sample_rate: Optional[float] = Field(
+        None,
+        description="Fraction of requests run under the sampling profiler (0.0 disables it)",
+        ge=0.0,
+        le=1.0
+    )
 
 
 class TicketResponse(BaseModel):
@@ -19,13 +19,64 @@ LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 
+# Generation Settings (structured output passes the MCP JSON schema to Ollama; num_predict is sized per query within these bounds)
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+LLM_MIN_PREDICT = int(os.getenv("LLM_MIN_PREDICT", "256"))
+LLM_MAX_PREDICT = int(os.getenv("LLM_MAX_PREDICT", "800"))
+
 # Model Settings
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
+# Knowledge base ingestion: comma-separated globs of JSON/JSONL sources (relative to the repository root).
+# data/top_questions.json repeats domain_management.json, so it is only used for precomputed answers.
+KB_SOURCES = [p.strip() for p in os.getenv(
+    "KB_SOURCES",
+    "data/domain_management.json,data/renewals_and_redemptions.json,data/transfers.json,data/data_use_information.json"
+).split(",") if p.strip()]
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "256"))
+# Vectors collected before training a compressed (PCA / int8) index
+INGEST_TRAIN_SIZE = int(os.getenv("INGEST_TRAIN_SIZE", "20000"))
+
 # RAG Settings
 TOP_K_RETRIEVAL = 3
 CONFIDENCE_THRESHOLD = 0.6
 
+# Narrowing retrieval to keyword-routed FAQ categories (falls back to a full search when too few FAQs match). Off by default:
+# on the small FAQ corpus filtering saves no time, and its effect on retrieval quality has not been measured.
+CATEGORY_ROUTING_ENABLED = os.getenv("CATEGORY_ROUTING_ENABLED", "false").lower() == "true"
+
+# Metadata fields that callers may filter on in /resolve-ticket
+FILTER_FIELDS = ("category", "source")
+
+# Tracing and profiling (the admin token gates runtime changes; admin endpoints are disabled when it is unset)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILE_DIR = BASE_DIR / "profiles"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Retrieval mode: "inprocess" loads the embedder and index in every API worker; "sidecar" uses one shared retrieval
+# service process (PYTHONPATH=src python -m embeddings.retrieval_service) over a Unix socket
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "inprocess")
+RETRIEVAL_SOCKET_PATH = os.getenv("RETRIEVAL_SOCKET_PATH", "/tmp/tucows-retrieval.sock")
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "64"))
+RETRIEVAL_BATCH_WAIT_MS = float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", "2"))
+# Seconds an API worker waits for a sidecar reply (retrieval runs on the worker's event loop, so this bounds how long it can stall)
+RETRIEVAL_TIMEOUT_S = float(os.getenv("RETRIEVAL_TIMEOUT_S", "5"))
+
 # Vector Store Settings
 FAISS_INDEX_PATH = FAISS_INDEX_DIR / "faqs.index"
 FAISS_METADATA_PATH = FAISS_INDEX_DIR / "metadata.json"
+FAISS_VECTORS_PATH = FAISS_INDEX_DIR / "vectors.npy"
+
+# Vector compression used when building the index: none (float32), fp16 or int8 scalar quantization, optionally after
+# PCA to VECTOR_PCA_DIM dimensions (0 disables PCA). Compressed indexes re-score a RESCORE_FACTOR x top_k shortlist
+# against exact float32 vectors (1 disables re-scoring).
+VECTOR_COMPRESSION = os.getenv("VECTOR_COMPRESSION", "none")
+VECTOR_PCA_DIM = int(os.getenv("VECTOR_PCA_DIM", "0"))
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
+# Precomputed answers for canonical questions (built with 'python scripts/build_index.py --precompute-answers')
+ANSWER_STORE_PATH = FAISS_INDEX_DIR / "answers.json"
+PRECOMPUTED_ANSWERS_ENABLED = os.getenv("PRECOMPUTED_ANSWERS_ENABLED", "true").lower() == "true"
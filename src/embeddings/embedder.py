@@ -1,7 +1,7 @@
 from typing import List
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from config import EMBEDDING_MODEL
+from utils.tracing import span
 
 
 class FAQEmbedder:
@@ -10,24 +10,29 @@ class FAQEmbedder:
     def __init__(self, model_name: str = EMBEDDING_MODEL):
         # Loading HuggingFace's Sentence Transformer model ("all-MiniLM-L6-v2" by default; this has 384 dimensions or features per text, and is fast).
         print(f"Loading embedding model: {model_name}")
+        # Importing here so API workers that embed through the retrieval sidecar never load torch.
+        from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer(model_name)
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
         print(f"Embedding dimension: {self.embedding_dim}")
 
-    def embed_texts(self, texts: List[str]) -> np.ndarray:
+    def embed_texts(self, texts: List[str], verbose: bool = True) -> np.ndarray:
         # Batch processing all FAQs, converting each String from a List of Strings (of FAQ data) into a normalized unit length vector (for easier cosine similarity) and returning a NumPy array with shape (number_of_texts, embedding_dim).
-        print(f"Embedding {len(texts)} texts...")
+        # verbose=False silences logging and the progress bar when called once per chunk by the ingestion pipeline.
+        if verbose:
+            print(f"Embedding {len(texts)} texts...")
         embeddings = self.model.encode(
             texts,
-            show_progress_bar=True,
+            show_progress_bar=verbose,
             normalize_embeddings=True
         )
         return embeddings
 
     def embed_query(self, query: str) -> np.ndarray:
         # Encoding user questions (Strings) as single queries into vectors, normalizing them thhe same way as the FAQs, and returning a vector (1D NumPy array) of shape (embedding_dim,).
-        embedding = self.model.encode(
-            query,
-            normalize_embeddings=True
-        )
+        with span("embedder.encode"):
+            embedding = self.model.encode(
+                query,
+                normalize_embeddings=True
+            )
         return embedding
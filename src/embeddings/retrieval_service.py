@@ -0,0 +1,254 @@
+# Shared embedding/retrieval sidecar: one process owns the embedding model and FAISS index and serves every API worker
+# over a Unix socket, batching concurrent embedding requests into a single encode call.
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from embeddings.vector_store import FAISSVectorStore
+from config import RETRIEVAL_SOCKET_PATH, RETRIEVAL_MAX_BATCH, RETRIEVAL_BATCH_WAIT_MS, RETRIEVAL_TIMEOUT_S
+from utils.tracing import span
+
+# Frame layout: JSON header length and binary payload length, then the JSON header, then raw payload bytes.
+# Query vectors travel as raw float32 bytes in the payload, so no pickling or JSON encoding of vectors is needed.
+_FRAME = struct.Struct("!II")
+
+
+def _encode_frame(header: Dict, payload: bytes = b"") -> bytes:
+    data = json.dumps(header).encode("utf-8")
+    return _FRAME.pack(len(data), len(payload)) + data + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Tuple[Dict, bytes]:
+    header_len, payload_len = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+class RetrievalService:
+    # Sidecar server wrapping an embedder (anything with embed_texts/embedding_dim) and a FAISSVectorStore.
+
+    def __init__(self, embedder, vector_store, max_batch: int = RETRIEVAL_MAX_BATCH, batch_wait_ms: float = RETRIEVAL_BATCH_WAIT_MS):
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self.stats = {"embedded": 0, "batches": 0, "searches": 0}
+        self._queue: Optional[asyncio.Queue] = None
+
+    async def serve(self, socket_path: str = RETRIEVAL_SOCKET_PATH):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self._queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batch_embed_loop())
+        server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+        print(f"Retrieval service listening on {socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Serving one API worker connection; each worker sends one request at a time and waits for the reply.
+        try:
+            while True:
+                header, payload = await _read_frame(reader)
+                try:
+                    response, body = await self._dispatch(header, payload)
+                except Exception as e:
+                    response, body = {"ok": False, "error": str(e)}, b""
+                writer.write(_encode_frame(response, body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, header: Dict, payload: bytes) -> Tuple[Dict, bytes]:
+        op = header.get("op")
+        if op == "embed":
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((header["text"], future))
+            vector = await future
+            return {"ok": True}, np.asarray(vector, dtype=np.float32).tobytes()
+        if op == "search":
+            # FAISS releases the GIL, so searches from different workers run in parallel on the default thread pool
+            query = np.frombuffer(payload, dtype=np.float32)
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self.vector_store.search, query, header.get("top_k", 3), header.get("filters")
+            )
+            self.stats["searches"] += 1
+            return {"ok": True, "results": results}, b""
+        if op == "info":
+            return {
+                "ok": True,
+                "embedding_dim": int(self.embedder.embedding_dim),
+                "index_version": self.vector_store.index_version,
+                "ntotal": int(self.vector_store.index.ntotal),
+                "stats": self.stats
+            }, b""
+        raise ValueError(f"Unknown operation: {op}")
+
+    async def _batch_embed_loop(self):
+        # Encoding queued texts together: waiting up to batch_wait for more requests after the first, and picking up everything that queued during the previous encode.
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Futures whose connection went away in the meantime are already cancelled, and setting them would kill the batcher
+            try:
+                vectors = await loop.run_in_executor(None, self.embedder.embed_texts, [text for text, _ in batch], False)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+            self.stats["embedded"] += len(batch)
+            self.stats["batches"] += 1
+
+
+class RetrievalClient:
+    # Blocking client used by each API worker; one connection per process, serialized with a lock (the answer refresh thread shares it).
+
+    def __init__(
+            self,
+            socket_path: str = RETRIEVAL_SOCKET_PATH,
+            connect_timeout: float = 30.0,
+            timeout: float = RETRIEVAL_TIMEOUT_S
+    ):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._connect(connect_timeout)
+        self.info = self.request({"op": "info"})[0]
+
+    def _connect(self, connect_timeout: float):
+        # Retrying until the sidecar is up, since workers and the sidecar may start at the same time.
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                sock.settimeout(self.timeout)
+                self._sock = sock
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise ConnectionError(f"Retrieval service not reachable at {self.socket_path}. Start it with 'python -m embeddings.retrieval_service'.")
+                time.sleep(0.1)
+
+    def _recv_exactly(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Retrieval service closed the connection")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _roundtrip(self, frame: bytes) -> Tuple[Dict, bytes]:
+        self._sock.sendall(frame)
+        header_len, payload_len = _FRAME.unpack(self._recv_exactly(_FRAME.size))
+        header = json.loads(self._recv_exactly(header_len))
+        payload = self._recv_exactly(payload_len) if payload_len else b""
+        return header, payload
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def request(self, header: Dict, payload: bytes = b"") -> Tuple[Dict, bytes]:
+        frame = _encode_frame(header, payload)
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect(self.timeout)
+                    response, body = self._roundtrip(frame)
+                    break
+                except socket.timeout as e:
+                    # Dropping the connection, since a late reply would otherwise be read as the answer to the next request
+                    self._close()
+                    raise TimeoutError(f"Retrieval service did not respond within {self.timeout}s") from e
+                except (ConnectionError, OSError):
+                    # Reconnecting once in case the sidecar was restarted
+                    self._close()
+                    if attempt:
+                        raise
+        if not response.get("ok"):
+            raise RuntimeError(f"Retrieval service error: {response.get('error')}")
+        return response, body
+
+
+class RemoteEmbedder:
+    # FAQEmbedder stand-in that embeds queries in the retrieval service.
+
+    def __init__(self, client: RetrievalClient):
+        self.client = client
+        self.embedding_dim = client.info["embedding_dim"]
+
+    def embed_query(self, query: str) -> np.ndarray:
+        with span("retrieval_service.embed"):
+            _, payload = self.client.request({"op": "embed", "text": query})
+        return np.frombuffer(payload, dtype=np.float32)
+
+
+class RemoteVectorStore:
+    # FAISSVectorStore stand-in that searches the index owned by the retrieval service.
+
+    def __init__(self, client: RetrievalClient):
+        self.client = client
+
+    @property
+    def index_version(self) -> str:
+        return self.client.info["index_version"]
+
+    def search(
+            self,
+            query_embedding: np.ndarray,
+            top_k: int = 3,
+            filters: Optional[Dict[str, Union[str, List[str]]]] = None
+    ) -> List[Dict]:
+        payload = np.asarray(query_embedding, dtype=np.float32).tobytes()
+        with span("retrieval_service.search"):
+            response, _ = self.client.request({"op": "search", "top_k": top_k, "filters": filters}, payload)
+        return response["results"]
+
+
+def main():
+    # Loading the embedding model and FAISS index once and serving all API workers (run with: PYTHONPATH=src python -m embeddings.retrieval_service).
+    from embeddings.embedder import FAQEmbedder
+    print("Starting Tucows Domains retrieval service...")
+    embedder = FAQEmbedder()
+    vector_store = FAISSVectorStore(embedding_dim=embedder.embedding_dim)
+    vector_store.load_index()
+    asyncio.run(RetrievalService(embedder, vector_store).serve())
+
+
+if __name__ == "__main__":
+    main()
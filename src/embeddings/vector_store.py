@@ -1,20 +1,77 @@
 # FAISS-based vector storage and retrieval for fast vector similarity search.
+import hashlib
 import json
+import os
+import tempfile
 import numpy as np
 import faiss
-from typing import List, Dict
-from config import FAISS_INDEX_PATH, FAISS_METADATA_PATH
+from typing import Any, List, Dict, Optional, Tuple, Union
+from config import (
+    FAISS_INDEX_PATH, FAISS_METADATA_PATH, FAISS_VECTORS_PATH, VECTOR_COMPRESSION, VECTOR_PCA_DIM, RESCORE_FACTOR
+)
+from utils.tracing import span
+
+# Upper bound on cached filter selectors (filters can come from callers, so the cache must not grow without limit)
+MAX_CACHED_SELECTORS = 128
+
+# Rows copied per write when exact vectors are streamed into vectors.npy
+_COPY_ROWS = 1 << 14
+
+# Scalar quantizer types for the supported compression options ("none" keeps exact float32 vectors in IndexFlatIP)
+SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
 
 
 class FAISSVectorStore:
     # FAISS index management for FAQ retrieval based on vector similarity.
 
-    def __init__(self, embedding_dim: int = 384):
+    def __init__(
+            self,
+            embedding_dim: int = 384,
+            compression: str = VECTOR_COMPRESSION,
+            pca_dim: int = VECTOR_PCA_DIM,
+            rescore_factor: int = RESCORE_FACTOR
+    ):
         # Initializing a FAISS index for inner product similarity search. Since our embeddings are normalized, inner product is the same as cosine similarity.
         self.embedding_dim = embedding_dim
-        # Use IndexFlatIP for cosine similarity (Inner Product with normalized vectors)
-        self.index = faiss.IndexFlatIP(embedding_dim)
+        self.compression = compression
+        self.index = self._create_index(embedding_dim, compression, pca_dim)
         self.metadata: List[Dict] = []
+        # Exact float32 vectors kept alongside a compressed index to re-score its shortlist. They are appended to a temporary
+        # file while building and memory-mapped (from that file, or from vectors.npy once loaded), so they never sit in RAM.
+        self.rescore_factor = rescore_factor
+        self._vector_file = None
+        self._vector_count = 0
+        self._vectors: Optional[np.ndarray] = None
+        # PCA bias (-A @ mean), removed from projected queries so that ranking does not depend on the training mean
+        self._pca_bias: Optional[np.ndarray] = None
+        # Inverted index from metadata field -> value -> row IDs, built lazily per field for filtered search
+        self._field_ids: Dict[str, Dict[Any, np.ndarray]] = {}
+        # FAISS ID selectors cached per filter, since building one costs about as much as the scan it narrows
+        self._selectors: Dict[tuple, Tuple[int, faiss.IDSelector]] = {}
+
+    @staticmethod
+    def _create_index(embedding_dim: int, compression: str = "none", pca_dim: int = 0) -> faiss.Index:
+        # Building the index for the requested storage format: optional PCA reduction to pca_dim, then float32, fp16 or int8 codes.
+        if compression != "none" and compression not in SCALAR_QUANTIZERS:
+            raise ValueError(f"Unknown vector compression '{compression}' (expected none, fp16 or int8)")
+
+        dim = pca_dim if 0 < pca_dim < embedding_dim else embedding_dim
+        if compression == "none":
+            # Use IndexFlatIP for cosine similarity (Inner Product with normalized vectors)
+            index = faiss.IndexFlatIP(dim)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, SCALAR_QUANTIZERS[compression], faiss.METRIC_INNER_PRODUCT)
+
+        if dim != embedding_dim:
+            index = faiss.IndexPreTransform(faiss.PCAMatrix(embedding_dim, dim), index)
+        return index
+
+    @property
+    def is_compressed(self) -> bool:
+        return not isinstance(self.index, faiss.IndexFlat)
 
     def add_vectors(self, embeddings: np.ndarray, metadata: List[Dict]):
         # Taking a list of embeddings and their corresponding metadata to add to the FAISS index.
@@ -23,25 +80,60 @@ class FAISSVectorStore:
         # Converting to float32 (FAISS requirement)
         embeddings = embeddings.astype('float32')
 
+        # Training PCA / quantizer ranges on the first batch when the index needs it
+        if not self.index.is_trained:
+            if isinstance(self.index, faiss.IndexPreTransform) and len(embeddings) < self.index.index.d:
+                # FAISS cannot fit more PCA components than training vectors, so small corpora are stored without PCA
+                print(f"Skipping PCA: {len(embeddings)} training vectors are fewer than the {self.index.index.d} PCA dimensions")
+                self.index = self._create_index(self.embedding_dim, self.compression)
+            print(f"Training compressed index on {len(embeddings)} vectors...")
+            self.index.train(embeddings)
+            self._pca_bias = None
+
         # Adding to FAISS index
         self.index.add(embeddings)
+        if self.is_compressed:
+            self._append_exact_vectors(embeddings)
         self.metadata.extend(metadata)
+        self._field_ids.clear()
+        self._selectors.clear()
 
         print(f"Added {len(embeddings)} vectors to FAISS index")
         print(f"Total vectors in index: {self.index.ntotal}")
 
-    def search(self, query_embedding: np.ndarray, top_k: int = 3) -> List[Dict]:
+    def search(
+            self,
+            query_embedding: np.ndarray,
+            top_k: int = 3,
+            filters: Optional[Dict[str, Union[str, List[str]]]] = None
+    ) -> List[Dict]:
         # This function searches the FAISS index for the top_k most similar vectors to the query_embedding. It returns a list of metadata dictionaries for the most similar FAQs along with their similarity scores.
+        # Optional filters (e.g. {"category": ["transfers"]}) restrict the search to rows whose metadata matches every field; a list value matches any of its entries.
 
         # Reshaping for FAISS (since it expects a 2D array)
         query_embedding = query_embedding.reshape(1, -1).astype('float32')
 
-        # Searching (returns distances and indices)
-        distances, indices = self.index.search(query_embedding, top_k)
+        # Restricting the candidate set with a FAISS ID selector so non-matching rows are skipped during the scan
+        params = None
+        if filters:
+            with span("faiss.filter"):
+                num_candidates, selector = self._filter_selector(filters)
+            if num_candidates == 0:
+                return []
+            top_k = min(top_k, num_candidates)
+            params = faiss.SearchParameters(sel=selector)
+
+        # Searching (returns distances and indices), over-fetching a shortlist when a compressed index will be re-scored exactly
+        rescore = self.is_compressed and self.rescore_factor > 1 and self._exact_vectors() is not None
+        with span("faiss.search"):
+            distances, indices = self._search_index(query_embedding, top_k * self.rescore_factor if rescore else top_k, params)
+        if rescore:
+            with span("faiss.rescore"):
+                distances, indices = self._rescore(query_embedding, indices[0], top_k)
 
         results = []
         for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.metadata):  # Valid index
+            if 0 <= idx < len(self.metadata):  # Valid index (FAISS pads missing results with -1)
                 results.append({
                     'faq': self.metadata[idx],
                     'similarity_score': float(dist)  # Higher = more similar
@@ -49,9 +141,112 @@ class FAISSVectorStore:
 
         return results
 
+    def _search_index(self, query_embedding: np.ndarray, k: int, params: Optional[faiss.SearchParameters]):
+        index = self.index
+        if isinstance(index, faiss.IndexPreTransform):
+            # IndexPreTransform does not forward search parameters (ID selectors), so the PCA transform is applied here instead.
+            # Only stored vectors are centered: centering the query too would add a per-row -mean·Ax term to every score.
+            pca = faiss.downcast_VectorTransform(index.chain.at(0))
+            if self._pca_bias is None:
+                self._pca_bias = faiss.vector_to_array(pca.b).astype('float32')
+            query_projection = pca.apply(query_embedding) - self._pca_bias
+            distances, indices = faiss.downcast_index(index.index).search(query_projection, k, params=params)
+            # Stored vectors carry the bias (A(x - mean) = Ax + b), which shifts every score for this query by projection·b.
+            # Removing it keeps scores comparable to float32 ones, since they feed confidence scoring and escalation.
+            return distances - query_projection @ self._pca_bias, indices
+        return index.search(query_embedding, k, params=params)
+
+    def _rescore(self, query_embedding: np.ndarray, shortlist: np.ndarray, top_k: int):
+        # Re-ranking the compressed index's shortlist with exact float32 inner products.
+        shortlist = np.sort(shortlist[shortlist >= 0])
+        scores = self._exact_vectors()[shortlist] @ query_embedding[0]
+        order = np.argsort(-scores)[:top_k]
+        return scores[order][None, :], shortlist[order][None, :]
+
+    def _append_exact_vectors(self, embeddings: np.ndarray):
+        if self._vector_file is None:
+            self._vector_file = tempfile.TemporaryFile(dir=FAISS_VECTORS_PATH.parent if FAISS_VECTORS_PATH.parent.exists() else None)
+            # Carrying over vectors loaded from disk when an existing index is extended
+            if self._vectors is not None:
+                for start in range(0, len(self._vectors), _COPY_ROWS):
+                    self._vector_file.write(np.ascontiguousarray(self._vectors[start:start + _COPY_ROWS]).tobytes())
+        self._vector_file.seek(0, os.SEEK_END)
+        self._vector_file.write(embeddings.tobytes())
+        self._vector_count = self.index.ntotal
+        self._vectors = None
+
+    def _exact_vectors(self) -> Optional[np.ndarray]:
+        if self._vectors is None and self._vector_file is not None and self._vector_count:
+            self._vector_file.flush()
+            self._vectors = np.memmap(self._vector_file, dtype='float32', mode='r', shape=(self._vector_count, self.embedding_dim))
+        return self._vectors
+
+    @property
+    def index_version(self) -> str:
+        # Short content hash of the indexed metadata, used to tag artifacts (like precomputed answers) built against this index.
+        content = json.dumps(self.metadata, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(content).hexdigest()[:12]
+
+    @property
+    def categories(self) -> List[str]:
+        # Listing the FAQ categories present in the index (empty for indexes built before category metadata was kept).
+        return sorted(self._field_value_ids("category"))
+
+    def _filter_selector(self, filters: Dict[str, Union[str, List[str]]]) -> Tuple[int, faiss.IDSelector]:
+        # Returning the number of matching rows and a FAISS ID selector over them.
+        key = tuple(sorted(
+            (field, tuple(sorted(map(repr, value))) if isinstance(value, (list, tuple, set)) else repr(value))
+            for field, value in filters.items()
+        ))
+        # Searches run concurrently (sidecar thread pool, answer refresh thread), so another thread may clear the cache at any
+        # point; the selector is therefore built into and returned from a local rather than re-read from the cache.
+        cached = self._selectors.get(key)
+        if cached is None:
+            if len(self._selectors) >= MAX_CACHED_SELECTORS:
+                self._selectors.clear()
+            candidate_ids = self._filter_ids(filters)
+            cached = (int(candidate_ids.size), faiss.IDSelectorBatch(candidate_ids))
+            self._selectors[key] = cached
+        return cached
+
+    def _filter_ids(self, filters: Dict[str, Union[str, List[str]]]) -> np.ndarray:
+        # Intersecting the row IDs that match every filter field.
+        selected = None
+        for field, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            value_ids = self._field_value_ids(field)
+            matches = [value_ids[v] for v in values if v in value_ids]
+            ids = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype='int64')
+            selected = ids if selected is None else np.intersect1d(selected, ids, assume_unique=True)
+        return selected if selected is not None else np.empty(0, dtype='int64')
+
+    def _field_value_ids(self, field: str) -> Dict[Any, np.ndarray]:
+        # Grouping row IDs by the scalar values of a metadata field, cached until the index changes.
+        value_ids = self._field_ids.get(field)
+        if value_ids is None:
+            groups: Dict[Any, List[int]] = {}
+            for row_id, meta in enumerate(self.metadata):
+                value = meta.get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    groups.setdefault(value, []).append(row_id)
+            value_ids = {v: np.array(ids, dtype='int64') for v, ids in groups.items()}
+            self._field_ids[field] = value_ids
+        return value_ids
+
     def save_index(self):
         # This function saves the FAISS index and metadata to disk so that it can be reloaded later without rebuilding.
         faiss.write_index(self.index, str(FAISS_INDEX_PATH))
+        vectors = self._exact_vectors() if self.is_compressed else None
+        if vectors is not None:
+            # Copying in blocks from the memory-mapped vectors (and replacing atomically, since they may be mapped from this file)
+            tmp_path = FAISS_VECTORS_PATH.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                header = {'descr': np.lib.format.dtype_to_descr(vectors.dtype), 'fortran_order': False, 'shape': vectors.shape}
+                np.lib.format.write_array_header_1_0(f, header)
+                for start in range(0, len(vectors), _COPY_ROWS):
+                    f.write(np.ascontiguousarray(vectors[start:start + _COPY_ROWS]).tobytes())
+            os.replace(tmp_path, FAISS_VECTORS_PATH)
+            print(f"Saved exact vectors for re-scoring to {FAISS_VECTORS_PATH}")
 
         with open(FAISS_METADATA_PATH, 'w', encoding='utf-8') as f:
             json.dump(self.metadata, f, indent=2)
@@ -65,8 +260,21 @@ class FAISSVectorStore:
             raise FileNotFoundError("FAISS index files not found. Run build_index.py first.")
 
         self.index = faiss.read_index(str(FAISS_INDEX_PATH))
+        self.embedding_dim = self.index.d
+        self._vector_file = None
+        self._vector_count = 0
+        self._vectors = None
+        self._pca_bias = None
+        if self.is_compressed:
+            if FAISS_VECTORS_PATH.exists():
+                self._vectors = np.load(FAISS_VECTORS_PATH, mmap_mode='r')
+            else:
+                print(f"Warning: {FAISS_VECTORS_PATH} not found, so the compressed index is searched without exact re-scoring "
+                      f"(scores and ranking are approximate). Rebuild the index to restore it.")
 
         with open(FAISS_METADATA_PATH, 'r', encoding='utf-8') as f:
             self.metadata = json.load(f)
+        self._field_ids.clear()
+        self._selectors.clear()
 
         print(f"Loaded FAISS index with {self.index.ntotal} vectors")
@@ -0,0 +1,58 @@
+# Tolerant parsing of near-valid JSON from the LLM (code fences, surrounding prose, trailing commas, truncated output).
+import json
+import re
+from typing import Dict, Optional
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def repair_json(content: str) -> Optional[Dict]:
+    # Returning the repaired JSON object, or None when the content cannot be turned into one.
+    start = content.find("{")
+    if start == -1:
+        return None
+    text = content[start:]
+
+    # Dropping prose or code fences after the last closing brace, if the object looks complete
+    end = text.rfind("}")
+    candidates = [text[:end + 1]] if end != -1 else []
+    candidates.append(_close_truncated(text))
+
+    for candidate in candidates:
+        try:
+            result = json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(result, dict):
+            return result
+    return None
+
+
+def _close_truncated(text: str) -> str:
+    # Closing an object cut off mid-generation: terminating an open string, dropping a dangling key or comma, and closing brackets.
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text = (text[:-1] if escaped else text) + '"'
+    text = text.rstrip()
+
+    # A trailing key without a value ("key" or "key":) cannot be completed, so it is removed
+    text = re.sub(r'[,{]\s*"[^"]*"\s*:?\s*$', lambda m: m.group(0)[0] if m.group(0)[0] == "{" else "", text)
+    text = re.sub(r'[,:]\s*$', "", text)
+    return text + "".join(reversed(stack))
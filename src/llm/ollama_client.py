@@ -1,47 +1,76 @@
 # Ollama LLM integration with structured output.
 import json
+import re
+import threading
 from typing import Dict, List
 import ollama
-from config import OLLAMA_HOST, OLLAMA_MODEL
-from llm.prompt_templates import MCP_SYSTEM_PROMPT, build_user_prompt
+from config import OLLAMA_HOST, OLLAMA_MODEL, LLM_STRUCTURED_OUTPUT, LLM_MIN_PREDICT, LLM_MAX_PREDICT
+from llm.prompt_templates import build_system_prompt, build_mcp_schema, build_user_prompt
+from llm.json_repair import repair_json
+from utils.tracing import span, record_timing
+
+_HOW_TO = re.compile(r"\b(how (do|can|to|long)|steps?|walk me through|instructions?)\b", re.IGNORECASE)
+
+
+def estimate_num_predict(ticket_text: str, include_reasoning: bool = True) -> int:
+    # Sizing the generation budget to the query: longer, multi-part and how-to tickets get more room, reasoning adds a fixed share.
+    budget = LLM_MIN_PREDICT + 2 * len(ticket_text.split()) + 96 * (max(ticket_text.count("?"), 1) - 1)
+    if _HOW_TO.search(ticket_text):
+        budget += 128
+    if include_reasoning:
+        budget += 200
+    return min(budget, LLM_MAX_PREDICT)
 
 
 class TucowsSupportLLM:
 
-    def __init__(self, host: str = OLLAMA_HOST, model: str = OLLAMA_MODEL):
+    def __init__(self, host: str = OLLAMA_HOST, model: str = OLLAMA_MODEL, structured_output: bool = LLM_STRUCTURED_OUTPUT):
         print(f"[INIT] Initializing Ollama client...")
         print(f"[INIT] Host: {host}")
         print(f"[INIT] Model: {model}")
         try:
             self.client = ollama.Client(host=host)
             self.model = model
+            self.structured_output = structured_output
+            # Running counters for generated tokens and fallback rate (see get_stats), updated under a lock since requests and
+            # background work can generate concurrently
+            self.stats = {"requests": 0, "fallbacks": 0, "repaired": 0, "retries": 0, "prompt_tokens": 0, "tokens_generated": 0}
+            self._stats_lock = threading.Lock()
             print("[INIT] Ollama client initialized successfully!")
         except Exception as e:
             print(f"[INIT] Failed to initialize Ollama client: {e}")
             raise e
 
-    def generate_response(self, ticket_text: str, retrieved_faqs: List[Dict]) -> Dict:
+    def generate_response(self, ticket_text: str, retrieved_faqs: List[Dict], include_reasoning: bool = True) -> Dict:
         print(f"\n[LLM] Generating response for ticket: {ticket_text[:60]}...")
         print(f"[LLM] Retrieved {len(retrieved_faqs)} FAQs")
 
-        user_prompt = build_user_prompt(ticket_text, retrieved_faqs)
+        with span("llm.build_prompt"):
+            user_prompt = build_user_prompt(ticket_text, retrieved_faqs)
         print(f"[LLM] Prompt built successfully (length: {len(user_prompt)} chars)")
 
+        # Constraining output to the MCP schema with a per-query token budget (legacy mode: free-form JSON, fixed budget)
+        if self.structured_output:
+            response_format = build_mcp_schema(include_reasoning)
+            num_predict = estimate_num_predict(ticket_text, include_reasoning)
+        else:
+            response_format = "json"
+            num_predict = LLM_MAX_PREDICT
+        self._count("requests")
+
+        messages = [
+            {"role": "system", "content": build_system_prompt(include_reasoning)},
+            {"role": "user", "content": user_prompt}
+        ]
+
         try:
-            print("[LLM] Sending request to Ollama model...")
-            response = self.client.chat(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": MCP_SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                format="json",
-                options={
-                    "temperature": 0.3,
-                    "num_predict": 800
-                }
-            )
-            print("[LLM] Received response from Ollama")
+            response = self._chat(messages, response_format, num_predict)
+            if response.get("done_reason") == "length" and num_predict < LLM_MAX_PREDICT:
+                # Output cut off by the per-query budget: regenerating once with the full budget instead of repairing a half-finished answer
+                print(f"[LLM] Output hit num_predict ({num_predict}), retrying with {LLM_MAX_PREDICT}")
+                self._count("retries")
+                response = self._chat(messages, response_format, LLM_MAX_PREDICT)
+            truncated = response.get("done_reason") == "length"
 
             # Log response for debugging
             print(f"[LLM] Raw response: {response}")
@@ -49,7 +78,19 @@ class TucowsSupportLLM:
             content = response["message"]["content"]
             print(f"[LLM] Content received (length: {len(content)} chars)")
 
-            result = json.loads(content)
+            repaired = False
+            with span("llm.parse_json"):
+                try:
+                    result = json.loads(content)
+                except json.JSONDecodeError:
+                    # Repairing near-valid or truncated JSON before giving up on the generation (structured mode only, so the
+                    # legacy mode still reports its real fallback rate)
+                    result = repair_json(content) if self.structured_output else None
+                    if result is None:
+                        raise
+                    repaired = True
+                    self._count("repaired")
+                    print("[LLM] Repaired malformed JSON")
             print("[LLM] Parsed JSON successfully")
 
             required_keys = ["answer", "references", "action_required"]
@@ -57,7 +98,12 @@ class TucowsSupportLLM:
                 print(f"[LLM] Missing keys in response: {result}")
                 raise ValueError(f"Missing required keys in LLM response: {result}")
 
+            if repaired and truncated:
+                # The answer was cut off mid-generation even at the full budget, so it is not sent as-is
+                print("[LLM] Answer truncated at the token limit, flagging for human review")
+                result["action_required"] = "needs_human_review"
             result.setdefault("reasoning_trace", None)
+            result["repaired"] = repaired
             print(f"[LLM] Final structured response ready")
             return result
 
@@ -68,8 +114,50 @@ class TucowsSupportLLM:
             print(f"[ERROR] Ollama error: {e}")
             return self._fallback_response(str(e))
 
+    def _chat(self, messages: List[Dict], response_format, num_predict: int):
+        # Sending one generation request and recording its timings and token usage.
+        print(f"[LLM] Sending request to Ollama model (num_predict: {num_predict})...")
+        with span("ollama.chat"):
+            response = self.client.chat(
+                model=self.model,
+                messages=messages,
+                format=response_format,
+                options={
+                    "temperature": 0.3,
+                    "num_predict": num_predict
+                }
+            )
+        print("[LLM] Received response from Ollama")
+
+        # Splitting server-side time into model load, prompt prefill and token generation (Ollama reports nanoseconds)
+        for key, name in (("load_duration", "ollama.load"), ("prompt_eval_duration", "ollama.prefill"), ("eval_duration", "ollama.decode")):
+            if response.get(key):
+                record_timing(name, response.get(key) / 1e6)
+
+        # Tracking token usage per request
+        self._count("prompt_tokens", response.get("prompt_eval_count") or 0)
+        self._count("tokens_generated", response.get("eval_count") or 0)
+        print(f"[LLM] Tokens generated: {response.get('eval_count')} (done reason: {response.get('done_reason')})")
+        return response
+
+    def get_stats(self) -> Dict:
+        # Summarizing token usage and fallback rate since startup.
+        with self._stats_lock:
+            stats = dict(self.stats)
+        requests = stats["requests"]
+        return {
+            **stats,
+            "fallback_rate": round(stats["fallbacks"] / requests, 4) if requests else 0.0,
+            "avg_tokens_generated": round(stats["tokens_generated"] / requests, 1) if requests else 0.0
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
     def _fallback_response(self, error_msg: str) -> Dict:
         print(f"[FALLBACK] Returning fallback response due to: {error_msg}")
+        self._count("fallbacks")
         return {
             "answer": "I'm experiencing technical difficulties. A support agent will assist you shortly.",
             "references": [],
@@ -1,7 +1,9 @@
 # File: src/llm/prompt_templates.py
 from typing import List, Dict
 
-MCP_SYSTEM_PROMPT = """You are an AI agent created to help support teams at Tucows Domains to customers' domain-related queries.
+ACTION_TYPES = ["none", "escalate_to_abuse_team", "needs_human_review", "contact_provider"]
+
+_PROMPT_INTRO = """You are an AI agent created to help support teams at Tucows Domains to customers' domain-related queries.
 
 **ROLE**: Analyze customer support tickets and provide actionable, accurate responses based on Tucows Domains' documentation.
 
@@ -19,15 +21,9 @@ MCP_SYSTEM_PROMPT = """You are an AI agent created to help support teams at Tuco
 4. Cite specific FAQ sources in references
 5. Determine if escalation or human review is needed
 
-**OUTPUT SCHEMA** (strict JSON format):
-{
-  "answer": "Clear, actionable response to the customer query",
-  "references": ["FAQ: Question title", "Policy: Section X.Y"],
-  "action_required": "none|escalate_to_abuse_team|needs_human_review|contact_provider",
-  "reasoning_trace": "Internal explanation of your decision-making process"
-}
+"""
 
-**RULES**:
+_PROMPT_RULES = """**RULES**:
 - Be concise and professional (2-3 sentences max for simple queries)
 - Always cite sources in the "references" array
 - If context is insufficient or unclear → "action_required": "needs_human_review"
@@ -37,6 +33,34 @@ MCP_SYSTEM_PROMPT = """You are an AI agent created to help support teams at Tuco
 - Do NOT make up information not in the provided context
 """
 
+# Schema fields in generation order: short fields come first so a response cut off by num_predict only loses the tail of the answer
+_SCHEMA_FIELDS = [
+    ("action_required", {"type": "string", "enum": ACTION_TYPES}, '"none|escalate_to_abuse_team|needs_human_review|contact_provider"'),
+    ("references", {"type": "array", "items": {"type": "string"}}, '["FAQ: Question title", "Policy: Section X.Y"]'),
+    ("answer", {"type": "string"}, '"Clear, actionable response to the customer query"'),
+    ("reasoning_trace", {"type": "string"}, '"Internal explanation of your decision-making process"'),
+]
+
+
+def build_mcp_schema(include_reasoning: bool = True) -> Dict:
+    # Building the MCP response JSON schema passed to Ollama's structured-output format (reasoning_trace only in debug mode).
+    fields = [f for f in _SCHEMA_FIELDS if include_reasoning or f[0] != "reasoning_trace"]
+    return {
+        "type": "object",
+        "properties": {name: schema for name, schema, _ in fields},
+        "required": [name for name, _, _ in fields]
+    }
+
+
+def build_system_prompt(include_reasoning: bool = True) -> str:
+    # Building the MCP system prompt with an output schema example matching build_mcp_schema.
+    fields = [f for f in _SCHEMA_FIELDS if include_reasoning or f[0] != "reasoning_trace"]
+    schema_lines = ",\n".join(f'  "{name}": {example}' for name, _, example in fields)
+    return f"{_PROMPT_INTRO}**OUTPUT SCHEMA** (strict JSON format):\n{{\n{schema_lines}\n}}\n\n{_PROMPT_RULES}"
+
+
+MCP_SYSTEM_PROMPT = build_system_prompt(include_reasoning=True)
+
 
 def build_user_prompt(ticket_text: str, retrieved_faqs: List[Dict]) -> str:
     # Building the user prompt with ticket and FAQ context. This is used alongside the MCP system prompt.
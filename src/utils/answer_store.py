@@ -0,0 +1,153 @@
+# On-disk store of precomputed MCP responses for canonical FAQ questions, built offline by scripts/build_index.py.
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from config import ANSWER_STORE_PATH
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where the API runs as a single process
+    fcntl = None
+
+
+def normalize_question(text: str) -> str:
+    # Normalizing case, punctuation and whitespace so near-exact phrasings of a question share one key.
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def faq_content_hash(faq: Dict) -> str:
+    # Hashing the question and answer text so an entry can be recognised as stale once its FAQ changes.
+    content = f"{faq.get('question', '')}\n{faq.get('answer', '')}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+class PrecomputedAnswerStore:
+    # Keyed store of validated responses, each tagged with the index version and FAQ hash it was generated from.
+
+    def __init__(self, path: Path = ANSWER_STORE_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        # Current FAQ content hash for every canonical question (normalized question -> hash)
+        self.faq_hashes: Dict[str, str] = {}
+        self.questions: Dict[str, str] = {}
+
+    def set_canonical_faqs(self, faqs: List[Dict]):
+        # Registering the canonical questions (and their current FAQ content) that the store should cover.
+        self.faq_hashes.clear()
+        self.questions.clear()
+        for faq in faqs:
+            key = normalize_question(faq.get("question", ""))
+            if key and key not in self.faq_hashes:
+                self.faq_hashes[key] = faq_content_hash(faq)
+                self.questions[key] = faq["question"]
+
+    def lookup(self, ticket_text: str) -> Optional[Dict]:
+        # Returning the stored response for a near-exact canonical question, or None if missing or its FAQ has changed.
+        key = normalize_question(ticket_text)
+        entry = self.entries.get(key)
+        if entry is None or entry.get("faq_hash") != self.faq_hashes.get(key):
+            return None
+        return dict(entry["response"])
+
+    def stale_questions(self, index_version: str, include_missing: bool = True) -> List[str]:
+        # Listing canonical questions whose entry was built from an older FAQ or against another index (and, optionally, those never built).
+        stale = []
+        for key, faq_hash in self.faq_hashes.items():
+            entry = self.entries.get(key)
+            if entry is None:
+                if include_missing:
+                    stale.append(self.questions[key])
+            elif entry.get("faq_hash") != faq_hash or entry.get("index_version") != index_version:
+                stale.append(self.questions[key])
+        return stale
+
+    def refresh(
+            self,
+            index_version: str,
+            generate_fn: Callable[[str], Optional[Dict]],
+            force: bool = False,
+            include_missing: bool = True
+    ) -> int:
+        # Regenerating stale (or, with force, all) canonical questions; generate_fn returns a validated response or None.
+        questions = list(self.questions.values()) if force else self.stale_questions(index_version, include_missing)
+        refreshed = 0
+        for question in questions:
+            response = generate_fn(question)
+            if response is None:
+                print(f"[ANSWERS] Skipping unvalidated response for: {question[:60]}")
+                continue
+            key = normalize_question(question)
+            self.entries[key] = {
+                "question": question,
+                "faq_hash": self.faq_hashes[key],
+                "index_version": index_version,
+                "response": response
+            }
+            refreshed += 1
+        print(f"[ANSWERS] Refreshed {refreshed}/{len(questions)} precomputed answers")
+        return refreshed
+
+    def refresh_and_save(
+            self,
+            index_version: str,
+            generate_fn: Callable[[str], Optional[Dict]],
+            include_missing: bool = True
+    ) -> int:
+        # Refreshing and saving stale entries once across processes sharing the store file (e.g. several uvicorn workers):
+        # the lock holder regenerates, every other process waits for it to finish and then loads its results.
+        with self.refresh_lock() as acquired:
+            if acquired:
+                # Reloading under the lock, since another process may have refreshed the store after this one loaded it
+                self.load()
+                refreshed = self.refresh(index_version, generate_fn, include_missing=include_missing)
+                if refreshed:
+                    self.save()
+                return refreshed
+
+        print("[ANSWERS] Another worker is refreshing precomputed answers, waiting to load its results")
+        with self.refresh_lock(blocking=True):
+            self.load()
+        return 0
+
+    @contextmanager
+    def refresh_lock(self, blocking: bool = False) -> Iterator[bool]:
+        # Holding an exclusive file lock so only one process refreshes the store at a time. Yields whether the lock was
+        # acquired (always, when blocking).
+        if fcntl is None:
+            yield True
+            return
+        with open(self.path.with_suffix(".lock"), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self):
+        # Loading stored entries from disk (a missing file leaves the store empty).
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.entries = json.load(f).get("entries", {})
+        print(f"Loaded {len(self.entries)} precomputed answers from {self.path}")
+
+    def save(self):
+        # Writing to a uniquely named temporary file first so a concurrent reader (or writer) never sees a half-written store.
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"entries": self.entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        print(f"Saved {len(self.entries)} precomputed answers to {self.path}")
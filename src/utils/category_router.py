@@ -0,0 +1,38 @@
+# Keyword-based category router used to narrow the FAISS candidate set before search.
+import re
+from typing import Dict, List, Tuple
+
+# Keywords (matched on word boundaries, case-insensitive) that point a ticket to an FAQ category
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "transfers": (
+        "transfer", "transferring", "epp", "auth code", "authorization code", "change of registrant",
+        "domain trade", "new owner", "ownership"
+    ),
+    "renewals_and_redemptions": (
+        "renew", "renewal", "renewed", "expire", "expired", "expiry", "expiration", "redemption",
+        "redeem", "pending delete", "restore"
+    ),
+    "data_use": (
+        "gdpr", "privacy", "personal data", "consent", "erasure", "data use", "eu"
+    ),
+    "domain_management": (
+        "dns", "nameserver", "nameservers", "whois", "password", "website", "domain provider",
+        "opensrs", "contact information", "manage your domain"
+    ),
+}
+
+_CATEGORY_PATTERNS = {
+    category: re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")\b", re.IGNORECASE)
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+
+def route_query(ticket_text: str) -> List[str]:
+    # Returning the categories whose keywords appear in the ticket; an empty list means no confident route (search everything).
+    return [category for category, pattern in _CATEGORY_PATTERNS.items() if pattern.search(ticket_text)]
+
+
+def build_category_filters(ticket_text: str) -> Dict[str, List[str]]:
+    # Building vector store filters from the routed categories (empty dict when nothing matched).
+    categories = route_query(ticket_text)
+    return {"category": categories} if categories else {}
@@ -1,41 +1,32 @@
 from typing import List, Dict
 import logging
 import json
-from config import DATA_DIR
+from config import DATA_DIR, KB_SOURCES
 
 
-def load_all_faqs() -> List[Dict]:
-    # Combining FAQs from multiple JSON files into a single list.
-    faq_files = {
-        "domain_management": DATA_DIR / "domain_management.json",
-        "renewals_and_redemptions": DATA_DIR / "renewals_and_redemptions.json",
-        "transfers": DATA_DIR / "transfers.json",
-        "data_use": DATA_DIR / "data_use_information.json",
-        "top_questions": DATA_DIR / "top_questions.json"
-    }
-
-    all_faqs = []
+def load_all_faqs(patterns: List[str] = KB_SOURCES) -> List[Dict]:
+    # Combining FAQs from the configured knowledge base sources into a single list (the same records the index is built from).
+    # Imported here because utils.ingestion itself builds records with this module's helpers.
+    from utils.ingestion import discover_sources, iter_source_records
 
-    for category, file_path in faq_files.items():
-        if not file_path.exists():
-            logging.warning(f"{file_path} does not exist. Skipping.")
-            continue
+    sources = discover_sources(patterns)
+    all_faqs = list(iter_source_records(sources))
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    logging.info(f"Loaded {len(all_faqs)} FAQs from {len(sources)} files")
+    return all_faqs
 
-        faqs = data if isinstance(data, list) else data.get('faqs', [])
 
-        for faq in faqs:
-            all_faqs.append({
-                "question": faq.get("question", ""),
-                "answer": faq.get("answer", ""),
-                # removed "category": category,
-                "related_links": faq.get("related_links", [])
-            })
+def build_faq_record(faq: Dict, category: str, source: str) -> Dict:
+    # Normalizing a raw FAQ/article record into the metadata stored in the index, keeping the source category and file so search can be pre-filtered by metadata.
+    return {
+        "question": faq.get("question") or faq.get("title") or "",
+        "answer": faq.get("answer") or faq.get("body") or faq.get("text") or "",
+        "category": faq.get("category") or category,
+        "source": source,
+        "related_links": faq.get("related_links", []),
+        "main_concepts": faq.get("main_concepts", [])
+    }
 
-    logging.info(f"Loaded {len(all_faqs)} FAQs from {len(faq_files)} files")
-    return all_faqs
 
 def prepare_faq_texts(faqs: List[Dict]) -> List[str]:
     # Combining question and answer fields from each FAQ into a single text block for embedding generation.
@@ -44,4 +35,23 @@ def prepare_faq_texts(faqs: List[Dict]) -> List[str]:
         combined = f"Question: {faq['question']}\n\nAnswer: {faq['answer']}"
         texts.append(combined)
 
-    return texts
\ No newline at end of file
+    return texts
+
+
+def load_canonical_faqs(patterns: List[str] = KB_SOURCES) -> List[Dict]:
+    # Collecting the canonical questions (indexed FAQs plus data/top_questions.json) used for precomputed answers, deduplicated by question.
+    faqs = load_all_faqs(patterns)
+
+    top_questions_path = DATA_DIR / "top_questions.json"
+    if top_questions_path.exists():
+        with open(top_questions_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        top_questions = data if isinstance(data, list) else data.get('top_questions', [])
+        faqs.extend({"question": q.get("question", ""), "answer": q.get("answer", "")} for q in top_questions)
+
+    canonical = {}
+    for faq in faqs:
+        if faq["question"] and faq["question"] not in canonical:
+            canonical[faq["question"]] = faq
+
+    return list(canonical.values())
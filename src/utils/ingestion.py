@@ -0,0 +1,237 @@
+# Streaming knowledge-base ingestion: discovers JSON/JSONL sources, parses them incrementally and embeds fixed-size chunks
+# across a process pool, adding each chunk to the index as it completes so memory stays bounded by the chunks in flight.
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from config import BASE_DIR, EMBEDDING_MODEL, KB_SOURCES, INGEST_WORKERS, INGEST_CHUNK_SIZE, INGEST_TRAIN_SIZE
+from embeddings.embedder import FAQEmbedder
+from embeddings.vector_store import FAISSVectorStore
+from utils.data_loader import build_faq_record, prepare_faq_texts
+
+# Categories for source files whose name differs from the category used in the index (otherwise the file stem is used)
+SOURCE_CATEGORIES = {"data_use_information": "data_use"}
+
+# Key of the FAQ array in object-shaped JSON files
+FAQ_ARRAY_KEY = "faqs"
+
+_READ_SIZE = 1 << 16
+
+
+def discover_sources(patterns: List[str]) -> List[Path]:
+    # Expanding glob patterns (relative to the repository root unless absolute) into an ordered list of JSON/JSONL files.
+    sources, seen = [], set()
+    for pattern in patterns:
+        full_pattern = pattern if os.path.isabs(pattern) else str(BASE_DIR / pattern)
+        for match in sorted(glob.glob(full_pattern, recursive=True)):
+            path = Path(match)
+            if path.suffix in (".json", ".jsonl") and path not in seen:
+                seen.add(path)
+                sources.append(path)
+    return sources
+
+
+class _JSONStream:
+    # Incremental reader over a JSON file that decodes one value at a time, reading more of the file only when needed.
+
+    def __init__(self, f, name: str):
+        self.f = f
+        self.name = name
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(_READ_SIZE)
+        self.eof = not chunk
+        self.buffer, self.pos = self.buffer[self.pos:] + chunk, 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        # Returning the next non-whitespace character without consuming it ("" at end of file).
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"{self.name}: expected '{char}' but found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        # Decoding the next complete value (strings are scanned by the JSON decoder, so brackets inside them are never matched).
+        while True:
+            self.peek()
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value is incomplete, so more of the file is read (a decode error at end of file is a real error)
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # A number or literal ending exactly at the buffer end may continue in the next read
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_items(path: Path, key: str = FAQ_ARRAY_KEY) -> Iterator:
+    # Streaming the items of a top-level JSON array, or of the array under `key` in a top-level object, without loading the
+    # whole file. Other fields of the object are skipped; any other structure raises ValueError.
+    with open(path, 'r', encoding='utf-8') as f:
+        stream = _JSONStream(f, path.name)
+        if stream.peek() == "{":
+            stream.expect("{")
+            while True:
+                if stream.peek() == "}":
+                    raise ValueError(f"{path.name}: no \"{key}\" array found")
+                name = stream.value()
+                stream.expect(":")
+                if name == key:
+                    break
+                stream.value()
+                if stream.peek() == ",":
+                    stream.expect(",")
+
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.value()
+            if stream.peek() == "]":
+                return
+            stream.expect(",")
+
+
+def iter_jsonl_items(path: Path) -> Iterator:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_source_records(sources: List[Path]) -> Iterator[Dict]:
+    # Yielding normalized FAQ records from every source, one at a time.
+    for path in sources:
+        category = SOURCE_CATEGORIES.get(path.stem, path.stem)
+        items = iter_jsonl_items(path) if path.suffix == ".jsonl" else iter_json_items(path)
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError(f"{path.name}: expected FAQ objects but found {type(item).__name__}")
+            record = build_faq_record(item, category, path.name)
+            if record["question"] or record["answer"]:
+                yield record
+
+
+def iter_chunks(records: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Embedder owned by each pool worker process (loaded once by _init_worker)
+_worker_embedder: Optional[FAQEmbedder] = None
+
+
+def _init_worker(model_name: str, num_threads: int):
+    global _worker_embedder
+    import torch
+    # Splitting the machine's cores between workers instead of letting every worker use all of them
+    torch.set_num_threads(num_threads)
+    _worker_embedder = FAQEmbedder(model_name)
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.embed_texts(texts, verbose=False)
+
+
+def _embed_chunks(
+        chunks: Iterator[List[Dict]],
+        embedder: Optional[FAQEmbedder],
+        workers: int,
+        model_name: str
+) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+    # Yielding (records, embeddings) in source order, encoding in-process for one worker or across a spawn-based process pool.
+    if workers <= 1:
+        embedder = embedder or FAQEmbedder(model_name)
+        for records in chunks:
+            yield records, embedder.embed_texts(prepare_faq_texts(records), verbose=False)
+        return
+
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(model_name, threads_per_worker)) as pool:
+        in_flight = deque()
+        for records in chunks:
+            in_flight.append((records, pool.submit(_encode_chunk, prepare_faq_texts(records))))
+            # Keeping at most two chunks per worker in flight so parsed-but-unembedded records cannot pile up
+            if len(in_flight) >= 2 * workers:
+                done_records, future = in_flight.popleft()
+                yield done_records, future.result()
+        while in_flight:
+            done_records, future = in_flight.popleft()
+            yield done_records, future.result()
+
+
+def ingest_sources(
+        vector_store: FAISSVectorStore,
+        patterns: List[str] = KB_SOURCES,
+        embedder: Optional[FAQEmbedder] = None,
+        workers: int = INGEST_WORKERS,
+        chunk_size: int = INGEST_CHUNK_SIZE,
+        model_name: str = EMBEDDING_MODEL
+) -> Dict:
+    # Ingesting every discovered source into vector_store chunk by chunk and returning throughput statistics.
+    sources = discover_sources(patterns)
+    print(f"Discovered {len(sources)} source files ({workers} encode worker(s), chunks of {chunk_size})")
+
+    start = time.perf_counter()
+    documents = 0
+    # A compressed index is trained on its first batch, so early chunks are held back until there are enough training vectors
+    untrained: List[Tuple[List[Dict], np.ndarray]] = []
+    untrained_count = 0
+
+    for records, embeddings in _embed_chunks(iter_chunks(iter_source_records(sources), chunk_size), embedder, workers, model_name):
+        documents += len(records)
+        if vector_store.index.is_trained:
+            vector_store.add_vectors(embeddings, records)
+            continue
+        untrained.append((records, embeddings))
+        untrained_count += len(records)
+        if untrained_count >= INGEST_TRAIN_SIZE:
+            _add_held_back(vector_store, untrained)
+            untrained = []
+    _add_held_back(vector_store, untrained)
+
+    elapsed = time.perf_counter() - start
+    docs_per_sec = documents / elapsed if elapsed > 0 else 0.0
+    print(f"Ingested {documents} documents from {len(sources)} sources in {elapsed:.1f}s ({docs_per_sec:.1f} docs/sec)")
+    return {"sources": len(sources), "documents": documents, "seconds": elapsed, "docs_per_sec": docs_per_sec}
+
+
+def _add_held_back(vector_store: FAISSVectorStore, held_back: List[Tuple[List[Dict], np.ndarray]]):
+    if held_back:
+        vector_store.add_vectors(
+            np.concatenate([embeddings for _, embeddings in held_back]),
+            [record for records, _ in held_back for record in records]
+        )
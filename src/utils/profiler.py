@@ -0,0 +1,45 @@
+# Lightweight sampling profiler that periodically snapshots one thread's stack and writes folded stacks for flamegraph tools.
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+
+class SamplingProfiler:
+    # Sampling the target thread's Python stack from a background thread every interval_ms milliseconds.
+
+    def __init__(self, thread_id: int, interval_ms: float = 5.0):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        self._thread.join()
+        return dict(self.stacks)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+
+def write_folded(stacks: Dict[str, int], path: Path):
+    # Writing stacks in the collapsed "frame;frame;frame count" format read by flamegraph.pl and speedscope.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
@@ -0,0 +1,107 @@
+# Request-scoped tracing: named timing spans around pipeline stages, collected per request via a context variable.
+import time
+import uuid
+from contextvars import ContextVar
+from typing import List, Optional
+from config import TRACING_ENABLED
+
+TRACE_HEADER = "X-Trace-ID"
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_tracing_enabled = TRACING_ENABLED
+
+
+class Trace:
+    # Timings collected for one request; each span is [name, start offset ms, duration ms].
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.start = time.perf_counter()
+        self.spans: List[list] = []
+
+    def record(self, name: str, duration_ms: float, start_ms: Optional[float] = None):
+        # Adding a timing measured elsewhere (e.g. durations reported by the Ollama server).
+        if start_ms is None:
+            start_ms = (time.perf_counter() - self.start) * 1000
+        self.spans.append([name, start_ms, duration_ms])
+
+    def summary(self) -> str:
+        total_ms = (time.perf_counter() - self.start) * 1000
+        spans = " ".join(f"{name}={duration:.1f}ms" for name, _, duration in self.spans)
+        return f"{self.trace_id} total={total_ms:.1f}ms {spans}"
+
+    def server_timing(self) -> str:
+        # Formatting spans as a Server-Timing header so they show up in browser dev tools.
+        return ", ".join(f"{name.replace('.', '-')};dur={duration:.1f}" for name, _, duration in self.spans)
+
+
+class _Span:
+    __slots__ = ("trace", "entry")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.entry = [name, 0.0, 0.0]
+
+    def __enter__(self):
+        # Appending on entry so spans are listed in start order, with nested spans after their parent.
+        self.entry[1] = (time.perf_counter() - self.trace.start) * 1000
+        self.trace.spans.append(self.entry)
+        return self
+
+    def __exit__(self, *exc):
+        self.entry[2] = (time.perf_counter() - self.trace.start) * 1000 - self.entry[1]
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    # Timing a block under the current request's trace; without an active trace this is a single context variable lookup.
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def record_timing(name: str, duration_ms: float):
+    # Recording an externally measured duration on the current trace, if any.
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(name, duration_ms)
+
+
+def tracing_enabled() -> bool:
+    return _tracing_enabled
+
+
+def set_tracing_enabled(enabled: bool):
+    global _tracing_enabled
+    _tracing_enabled = enabled
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_trace(trace_id: str) -> Optional[Trace]:
+    # Activating a trace for the current context when tracing is enabled (returns None otherwise).
+    if not _tracing_enabled:
+        return None
+    trace = Trace(trace_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace():
+    _current_trace.set(None)
@@ -0,0 +1,109 @@
+# Unit testing for the precomputed answer store
+
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from unittest.mock import MagicMock
+import numpy as np
+from utils.answer_store import PrecomputedAnswerStore, normalize_question
+from api.pipeline import precompute_answer
+
+FAQS = [
+    {"question": "Transfer my domain", "answer": "Unlock it and request the auth code."},
+    {"question": "Get my EPP/auth code", "answer": "Ask your Domain Provider."},
+]
+
+RESPONSE = {
+    "answer": "Unlock the domain and request the auth code from your provider.",
+    "references": ["FAQ: Transfer my domain"],
+    "action_required": "none",
+    "confidence_score": 0.8,
+    "reasoning_trace": None
+}
+
+
+# Testing that near-exact phrasings are served from the store after a round trip to disk
+def test_lookup_near_exact_match(tmp_path):
+    store = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    store.set_canonical_faqs(FAQS)
+    assert store.refresh("v1", lambda q: RESPONSE if q == "Transfer my domain" else None) == 1
+    store.save()
+
+    reloaded = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    reloaded.load()
+    reloaded.set_canonical_faqs(FAQS)
+
+    assert normalize_question("  transfer MY domain? ") == "transfer my domain"
+    assert reloaded.lookup("transfer my domain?")["answer"] == RESPONSE["answer"]
+    assert reloaded.lookup("Get my EPP/auth code") is None
+    assert reloaded.lookup("How do I transfer my domain to another registrar?") is None
+
+
+# Testing staleness after the FAQ content or index version changes
+def test_stale_entries(tmp_path):
+    store = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    store.set_canonical_faqs(FAQS)
+    store.refresh("v1", lambda q: RESPONSE)
+    assert store.stale_questions("v1") == []
+    assert len(store.stale_questions("v2")) == 2
+
+    # Changed FAQ answers stop being served and are listed for regeneration
+    store.set_canonical_faqs([{"question": "Transfer my domain", "answer": "A new transfer process."}, FAQS[1]])
+    assert store.lookup("Transfer my domain") is None
+    assert store.stale_questions("v1") == ["Transfer my domain"]
+
+    assert store.refresh("v1", lambda q: RESPONSE, include_missing=False) == 1
+    assert store.lookup("Transfer my domain") is not None
+
+
+# Testing that repaired (possibly truncated) LLM output is never stored as a precomputed answer
+def test_precompute_rejects_repaired_output():
+    embedder, vector_store, llm_client = MagicMock(), MagicMock(), MagicMock()
+    embedder.embed_query.return_value = np.zeros(4, dtype='float32')
+    vector_store.search.return_value = [{"faq": FAQS[0], "similarity_score": 0.9}]
+
+    llm_client.generate_response.return_value = {**RESPONSE, "repaired": False}
+    assert precompute_answer("Transfer my domain", embedder, vector_store, llm_client)["answer"] == RESPONSE["answer"]
+
+    llm_client.generate_response.return_value = {**RESPONSE, "answer": "Unlock the domain and", "repaired": True}
+    assert precompute_answer("Transfer my domain", embedder, vector_store, llm_client) is None
+
+
+# Testing that only one holder of the refresh lock regenerates the store, and that saves leave no temporary files behind
+def test_refresh_lock_and_save(tmp_path):
+    store = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    other = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    with store.refresh_lock() as acquired:
+        assert acquired
+        with other.refresh_lock() as other_acquired:
+            assert not other_acquired
+    with other.refresh_lock() as other_acquired:
+        assert other_acquired
+
+    store.set_canonical_faqs(FAQS)
+    store.refresh("v1", lambda q: RESPONSE)
+    store.save()
+    store.save()
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix != ".lock") == ["answers.json"]
+
+
+# Testing that a process which does not get the refresh lock waits for the holder and then serves its refreshed answers
+def test_refresh_and_save_waits_for_lock_holder(tmp_path):
+    holder = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    waiter = PrecomputedAnswerStore(path=tmp_path / "answers.json")
+    holder.set_canonical_faqs(FAQS)
+    waiter.set_canonical_faqs(FAQS)
+    generated = []
+
+    with holder.refresh_lock() as acquired:
+        assert acquired
+        thread = threading.Thread(target=waiter.refresh_and_save, args=("v1", lambda q: generated.append(q) or RESPONSE))
+        thread.start()
+        holder.refresh("v1", lambda q: RESPONSE)
+        holder.save()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert generated == []
+    assert waiter.lookup("Transfer my domain")["answer"] == RESPONSE["answer"]
@@ -47,4 +47,28 @@ def test_resolve_ticket_missing_field():
         "/resolve-ticket",
         json={}
     )
-    assert response.status_code == 422  # Validation error
\ No newline at end of file
+    assert response.status_code == 422  # Validation error
+
+def test_resolve_ticket_unknown_filter_field():
+# Testing that filters on fields that are not indexed are rejected as a validation error
+    response = client.post(
+        "/resolve-ticket",
+        json={"ticket_text": "How do I transfer my domain?", "filters": {"answer": "x"}}
+    )
+    assert response.status_code == 422
+
+
+def test_resolve_ticket_filters_match_nothing():
+# Testing that explicit filters matching no FAQs are a client error, not a server error
+    with patch("api.main.embedder") as mock_embedder, \
+         patch("api.main.vector_store") as mock_store, \
+         patch("api.main.answer_store", None):
+
+        mock_embedder.embed_query.return_value = [0.1, 0.2, 0.3]
+        mock_store.search.return_value = []
+
+        response = client.post(
+            "/resolve-ticket",
+            json={"ticket_text": "How do I transfer my domain?", "filters": {"category": "no_such_category"}}
+        )
+        assert response.status_code == 404
@@ -0,0 +1,82 @@
+# Unit testing for streaming knowledge base ingestion
+
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import numpy as np
+import pytest
+from config import KB_SOURCES
+from embeddings.vector_store import FAISSVectorStore
+from utils import ingestion
+from utils.data_loader import load_all_faqs
+from utils.ingestion import discover_sources, iter_json_items, iter_source_records, ingest_sources
+
+
+class FakeEmbedder:
+    # Deterministic stand-in for FAQEmbedder so ingestion can be tested without downloading a model
+    embedding_dim = 8
+
+    def embed_texts(self, texts, verbose=True):
+        rng = np.random.default_rng(len(texts))
+        vectors = rng.standard_normal((len(texts), self.embedding_dim)).astype('float32')
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# Testing incremental parsing of JSON arrays (top-level or under the "faqs" key) across read-buffer boundaries
+def test_iter_json_items_streams_arrays(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, "_READ_SIZE", 7)
+    items = [{"question": f"Q{i} with \"quotes\" and [brackets]", "answer": "A" * i} for i in range(20)]
+
+    (tmp_path / "list.json").write_text(json.dumps(items, indent=2))
+    (tmp_path / "nested.json").write_text(json.dumps({"title": "Help Center [2024]", "tags": ["x"], "count": 12345, "faqs": items}))
+    (tmp_path / "empty.json").write_text("[ ]")
+
+    assert list(iter_json_items(tmp_path / "list.json")) == items
+    assert list(iter_json_items(tmp_path / "nested.json")) == items
+    assert list(iter_json_items(tmp_path / "empty.json")) == []
+
+
+# Testing that unexpected file structures raise instead of silently ingesting nothing
+def test_iter_json_items_rejects_unexpected_structure(tmp_path):
+    (tmp_path / "other_key.json").write_text(json.dumps({"top_questions": [{"question": "Q"}]}))
+    (tmp_path / "scalars.json").write_text(json.dumps({"faqs": ["Q1", "Q2"]}))
+    (tmp_path / "not_array.json").write_text(json.dumps({"faqs": {"question": "Q"}}))
+
+    with pytest.raises(ValueError, match="no \"faqs\" array"):
+        list(iter_json_items(tmp_path / "other_key.json"))
+    with pytest.raises(ValueError, match="expected FAQ objects"):
+        list(iter_source_records([tmp_path / "scalars.json"]))
+    with pytest.raises(ValueError, match="expected '\\['"):
+        list(iter_json_items(tmp_path / "not_array.json"))
+
+
+# Testing that the FAQ loader (and so the canonical questions) follows the configured sources instead of a fixed file list
+def test_faq_loader_follows_sources(tmp_path):
+    records = list(iter_source_records(discover_sources(KB_SOURCES)))
+    assert records == load_all_faqs()
+    assert len(records) == 35 and {r["category"] for r in records} == {"domain_management", "renewals_and_redemptions", "transfers", "data_use"}
+
+    (tmp_path / "billing.jsonl").write_text(json.dumps({"question": "Why was I charged twice?", "answer": "Contact billing."}) + "\n")
+    faqs = load_all_faqs([str(tmp_path / "*.jsonl")])
+    assert [(f["question"], f["category"]) for f in faqs] == [("Why was I charged twice?", "billing")]
+
+
+# Testing chunked ingestion of JSONL sources, including held-back training chunks for a compressed index
+def test_ingest_sources_jsonl(tmp_path, monkeypatch):
+    with open(tmp_path / "tickets.jsonl", "w") as f:
+        for i in range(50):
+            f.write(json.dumps({"title": f"Ticket {i}", "body": f"Resolution {i}", "category": "tickets"}) + "\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    store = FAISSVectorStore(embedding_dim=8)
+    stats = ingest_sources(store, [str(tmp_path / "*")], embedder=FakeEmbedder(), workers=1, chunk_size=16)
+    assert stats["sources"] == 1 and stats["documents"] == 50
+    assert store.index.ntotal == 50
+    assert store.metadata[49]["question"] == "Ticket 49" and store.metadata[49]["category"] == "tickets"
+
+    monkeypatch.setattr(ingestion, "INGEST_TRAIN_SIZE", 30)
+    compressed = FAISSVectorStore(embedding_dim=8, compression="int8")
+    ingest_sources(compressed, [str(tmp_path / "*.jsonl")], embedder=FakeEmbedder(), workers=1, chunk_size=16)
+    assert compressed.index.ntotal == 50
+    assert [m["question"] for m in compressed.metadata] == [f"Ticket {i}" for i in range(50)]
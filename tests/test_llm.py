@@ -3,10 +3,12 @@
 import sys
 from pathlib import Path
 import json
+import threading
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from unittest.mock import patch, MagicMock
 from utils.confidence import calculate_confidence, should_escalate
-from llm.ollama_client import TucowsSupportLLM
+from llm.ollama_client import TucowsSupportLLM, estimate_num_predict
+from llm.json_repair import repair_json
 
 # Testing confidence calculation
 def test_calculate_confidence_basic():
@@ -122,3 +124,118 @@ def test_llm_missing_required_fields(mock_ollama_client):
 
     assert response["action_required"] == "needs_human_review"
     assert "Missing required keys" in response["reasoning_trace"]
+
+
+# Testing that the MCP schema is passed to Ollama and reasoning_trace is only requested in debug mode
+@patch("llm.ollama_client.ollama.Client")
+def test_llm_structured_output_schema(mock_ollama_client):
+    mock_client = MagicMock()
+    mock_client.chat.return_value = {
+        "message": {"content": json.dumps({"action_required": "none", "references": [], "answer": "Done."})},
+        "eval_count": 42
+    }
+    mock_ollama_client.return_value = mock_client
+
+    llm = TucowsSupportLLM(host="http://localhost:11434", model="llama3.2")
+    response = llm.generate_response("How do I transfer my domain?", [], include_reasoning=False)
+
+    kwargs = mock_client.chat.call_args.kwargs
+    assert kwargs["format"]["required"] == ["action_required", "references", "answer"]
+    assert "reasoning_trace" not in kwargs["messages"][0]["content"]
+    assert kwargs["options"]["num_predict"] < 800
+    assert response["reasoning_trace"] is None
+
+    llm.generate_response("How do I transfer my domain?", [], include_reasoning=True)
+    assert "reasoning_trace" in mock_client.chat.call_args.kwargs["format"]["required"]
+    assert llm.get_stats()["avg_tokens_generated"] == 42
+
+
+# Testing that output cut off by the per-query budget is regenerated once with the full budget
+@patch("llm.ollama_client.ollama.Client")
+def test_llm_truncated_output_retried(mock_ollama_client):
+    mock_client = MagicMock()
+    mock_client.chat.side_effect = [
+        {"message": {"content": '{"action_required": "none", "references": [], "answer": "Unlock the domain and'}, "done_reason": "length"},
+        {"message": {"content": json.dumps({"action_required": "none", "references": [], "answer": "Unlock the domain and request the EPP code."})}, "done_reason": "stop"}
+    ]
+    mock_ollama_client.return_value = mock_client
+
+    llm = TucowsSupportLLM(host="http://localhost:11434", model="llama3.2")
+    response = llm.generate_response("How do I transfer my domain?", [], include_reasoning=False)
+
+    assert response["answer"] == "Unlock the domain and request the EPP code."
+    assert response["action_required"] == "none" and response["repaired"] is False
+    assert mock_client.chat.call_args.kwargs["options"]["num_predict"] == 800
+    assert llm.get_stats()["retries"] == 1
+
+
+# Testing that an answer still truncated at the full budget is repaired but flagged for human review
+@patch("llm.ollama_client.ollama.Client")
+def test_llm_truncated_json_flagged(mock_ollama_client):
+    mock_client = MagicMock()
+    mock_client.chat.return_value = {
+        "message": {"content": '{"action_required": "none", "references": ["FAQ: Transfer my domain"], "answer": "Unlock the domain and'},
+        "done_reason": "length"
+    }
+    mock_ollama_client.return_value = mock_client
+
+    llm = TucowsSupportLLM(host="http://localhost:11434", model="llama3.2")
+    response = llm.generate_response("How do I transfer my domain?", [])
+
+    assert response["references"] == ["FAQ: Transfer my domain"]
+    assert response["action_required"] == "needs_human_review"
+    assert response["repaired"] is True
+    stats = llm.get_stats()
+    assert stats["repaired"] == 1 and stats["fallback_rate"] == 0.0
+
+
+# Testing that legacy free-form mode does not repair malformed JSON, so its fallback rate is the real baseline
+@patch("llm.ollama_client.ollama.Client")
+def test_llm_legacy_mode_not_repaired(mock_ollama_client):
+    mock_client = MagicMock()
+    mock_client.chat.return_value = {"message": {"content": '```json\n{"answer": "ok", "references": [], "action_required": "none",}\n```'}}
+    mock_ollama_client.return_value = mock_client
+
+    llm = TucowsSupportLLM(host="http://localhost:11434", model="llama3.2", structured_output=False)
+    response = llm.generate_response("How do I transfer my domain?", [])
+
+    assert response["action_required"] == "needs_human_review"
+    assert llm.get_stats()["fallbacks"] == 1
+
+
+# Testing the JSON repair parser and the generation budget heuristic
+def test_repair_json_and_num_predict():
+    assert repair_json('```json\n{"answer": "ok", "references": [],}\n```') == {"answer": "ok", "references": []}
+    assert repair_json('{"answer": "ok", "references": ["FAQ: a"], "action') == {"answer": "ok", "references": ["FAQ: a"]}
+    assert repair_json("no braces here") is None
+
+    short = estimate_num_predict("My domain expired.", include_reasoning=False)
+    longer = estimate_num_predict("How do I transfer my domain? And how long will it take?", include_reasoning=False)
+    assert short < longer <= 800
+    assert estimate_num_predict("My domain expired.", include_reasoning=True) > short
+
+
+
+# Testing that token and request counters stay exact when several threads generate at once
+@patch("llm.ollama_client.ollama.Client")
+def test_llm_stats_thread_safe(mock_ollama_client):
+    mock_client = MagicMock()
+    mock_client.chat.return_value = {
+        "message": {"content": json.dumps({"action_required": "none", "references": [], "answer": "Done."})},
+        "eval_count": 3
+    }
+    mock_ollama_client.return_value = mock_client
+    llm = TucowsSupportLLM(host="http://localhost:11434", model="llama3.2")
+
+    def worker():
+        for _ in range(50):
+            llm.generate_response("How do I transfer my domain?", [], include_reasoning=False)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = llm.get_stats()
+    assert stats["requests"] == 200 and stats["tokens_generated"] == 600
@@ -0,0 +1,101 @@
+# Unit testing for the shared embedding/retrieval sidecar
+
+import sys
+import asyncio
+import socket
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import numpy as np
+import pytest
+from embeddings.vector_store import FAISSVectorStore
+from embeddings.retrieval_service import RetrievalService, RetrievalClient, RemoteEmbedder, RemoteVectorStore
+
+
+class FakeEmbedder:
+    # Maps each known text to a fixed unit vector so results can be compared with a local search
+    embedding_dim = 4
+
+    def embed_texts(self, texts, verbose=True):
+        return np.array([np.eye(4, dtype='float32')[len(text) % 4] for text in texts])
+
+
+def _start_service(socket_path):
+    store = FAISSVectorStore(embedding_dim=4)
+    store.add_vectors(np.eye(4, dtype='float32'), [
+        {"question": f"q{i}", "answer": "", "category": "transfers" if i < 2 else "data_use"} for i in range(4)
+    ])
+    service = RetrievalService(FakeEmbedder(), store, batch_wait_ms=50)
+    threading.Thread(target=lambda: asyncio.run(service.serve(str(socket_path))), daemon=True).start()
+    return service, store
+
+
+# Testing that remote embedding and search match the in-process results, including filters
+def test_remote_embed_and_search(tmp_path):
+    _, store = _start_service(tmp_path / "retrieval.sock")
+    client = RetrievalClient(str(tmp_path / "retrieval.sock"), connect_timeout=5)
+    embedder, vector_store = RemoteEmbedder(client), RemoteVectorStore(client)
+
+    vector = embedder.embed_query("abc")
+    assert embedder.embedding_dim == 4
+    assert vector.dtype == np.float32 and vector.tolist() == [0.0, 0.0, 0.0, 1.0]
+    assert vector_store.search(vector, top_k=2) == store.search(vector, top_k=2)
+    assert vector_store.search(vector, top_k=2, filters={"category": "transfers"}) == store.search(vector, top_k=2, filters={"category": "transfers"})
+    assert vector_store.index_version == store.index_version
+
+
+# Testing that concurrent requests from several workers are batched into fewer encode calls
+def test_concurrent_embeds_are_batched(tmp_path):
+    service, _ = _start_service(tmp_path / "retrieval.sock")
+    clients = [RetrievalClient(str(tmp_path / "retrieval.sock"), connect_timeout=5) for _ in range(4)]
+    results = {}
+
+    def worker(i):
+        results[i] = RemoteEmbedder(clients[i]).embed_query("x" * i).tolist()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: np.eye(4)[i].tolist() for i in range(4)}
+    assert service.stats["embedded"] == 4
+    assert service.stats["batches"] < 4
+
+
+# Testing that a sidecar that accepts connections but never replies raises a timeout instead of blocking the worker
+def test_client_times_out_on_hung_service(tmp_path):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(tmp_path / "hung.sock"))
+    server.listen()
+    try:
+        start = time.monotonic()
+        with pytest.raises(TimeoutError, match="did not respond"):
+            RetrievalClient(str(tmp_path / "hung.sock"), connect_timeout=1, timeout=0.2)
+        assert time.monotonic() - start < 2
+    finally:
+        server.close()
+
+
+# Testing that the batcher keeps serving after a request's future was cancelled (e.g. its client disconnected)
+def test_batcher_survives_cancelled_future():
+    async def scenario():
+        service = RetrievalService(FakeEmbedder(), FAISSVectorStore(embedding_dim=4), batch_wait_ms=10)
+        service._queue = asyncio.Queue()
+        batcher = asyncio.create_task(service._batch_embed_loop())
+        loop = asyncio.get_running_loop()
+        cancelled, pending = loop.create_future(), loop.create_future()
+        cancelled.cancel()
+        await service._queue.put(("a", cancelled))
+        await service._queue.put(("ab", pending))
+        first = await asyncio.wait_for(pending, 5)
+        later = loop.create_future()
+        await service._queue.put(("abc", later))
+        second = await asyncio.wait_for(later, 5)
+        batcher.cancel()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.tolist() == np.eye(4)[2].tolist() and second.tolist() == np.eye(4)[3].tolist()
@@ -0,0 +1,59 @@
+# Unit testing for request tracing and the sampling profiler
+
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from utils import tracing
+from utils.tracing import span, record_timing, start_trace, end_trace
+from utils.profiler import SamplingProfiler, write_folded
+
+
+# Testing that spans are no-ops without an active trace
+def test_span_without_trace_is_noop():
+    with span("pipeline.embed") as s:
+        pass
+    assert s is tracing._NOOP_SPAN
+    record_timing("ollama.prefill", 12.0)
+
+
+# Testing that nested spans and external timings are recorded on the active trace
+def test_spans_recorded_on_trace():
+    tracing.set_tracing_enabled(True)
+    try:
+        trace = start_trace("abc123")
+        with span("pipeline.retrieve"):
+            with span("faiss.search"):
+                time.sleep(0.01)
+        record_timing("ollama.prefill", 12.0)
+        end_trace()
+    finally:
+        tracing.set_tracing_enabled(False)
+
+    names = [name for name, _, _ in trace.spans]
+    assert names == ["pipeline.retrieve", "faiss.search", "ollama.prefill"]
+    assert trace.spans[0][2] >= trace.spans[1][2] >= 10.0
+    assert "faiss-search;dur=" in trace.server_timing()
+    assert start_trace("disabled") is None
+
+
+def _busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+# Testing that the profiler captures folded stacks of the target thread
+def test_sampling_profiler_folded_output(tmp_path):
+    profiler = SamplingProfiler(threading.get_ident(), interval_ms=1)
+    profiler.start()
+    _busy_loop(0.1)
+    stacks = profiler.stop()
+
+    assert sum(stacks.values()) > 0
+    assert any("_busy_loop" in stack for stack in stacks)
+
+    write_folded(stacks, tmp_path / "trace.folded")
+    line = (tmp_path / "trace.folded").read_text().splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit()
@@ -0,0 +1,149 @@
+# Unit testing for FAISS vector store filtering and category routing
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import faiss
+import numpy as np
+from embeddings.vector_store import FAISSVectorStore
+from utils.category_router import route_query, build_category_filters
+
+
+def _build_store():
+    vectors = np.eye(4, dtype='float32')
+    metadata = [
+        {"question": "Transfer my domain", "answer": "", "category": "transfers"},
+        {"question": "Get my EPP/auth code", "answer": "", "category": "transfers"},
+        {"question": "What is the GDPR?", "answer": "", "category": "data_use"},
+        {"question": "Change my DNS nameservers", "answer": "", "category": "domain_management"},
+    ]
+    store = FAISSVectorStore(embedding_dim=4)
+    store.add_vectors(vectors, metadata)
+    return store
+
+
+# Testing that filtered search only returns FAQs from the requested category
+def test_search_with_category_filter():
+    store = _build_store()
+    query = np.array([0.1, 0.2, 0.9, 0.3], dtype='float32')
+
+    unfiltered = store.search(query, top_k=1)
+    filtered = store.search(query, top_k=3, filters={"category": "transfers"})
+
+    assert unfiltered[0]["faq"]["category"] == "data_use"
+    assert len(filtered) == 2
+    assert all(r["faq"]["category"] == "transfers" for r in filtered)
+    assert filtered[0]["faq"]["question"] == "Get my EPP/auth code"
+
+
+# Testing list filters and filters that match nothing
+def test_search_with_list_and_empty_filters():
+    store = _build_store()
+    query = np.array([0.1, 0.2, 0.9, 0.3], dtype='float32')
+
+    results = store.search(query, top_k=3, filters={"category": ["transfers", "domain_management"]})
+    assert {r["faq"]["category"] for r in results} == {"transfers", "domain_management"}
+    assert store.search(query, top_k=3, filters={"category": "renewals_and_redemptions"}) == []
+    assert store.categories == ["data_use", "domain_management", "transfers"]
+
+
+# Testing keyword routing of tickets to categories
+def test_route_query():
+    assert route_query("How do I get the EPP code to transfer my domain?") == ["transfers"]
+    assert "renewals_and_redemptions" in route_query("My domain expired last week, can I restore it?")
+    assert build_category_filters("Hello there, I need some help") == {}
+
+
+def _random_unit_vectors(num_vectors, dim, seed=0, mean_offset=0.0, latent_dim=None):
+    # Optionally low-rank (so PCA keeps the neighbours) and sharing a common mean component, as real sentence embeddings do.
+    rng = np.random.default_rng(seed)
+    if latent_dim:
+        vectors = rng.standard_normal((num_vectors, latent_dim)).astype('float32') @ rng.standard_normal((latent_dim, dim)).astype('float32')
+    else:
+        vectors = rng.standard_normal((num_vectors, dim)).astype('float32')
+    vectors += mean_offset * np.sqrt(dim) * rng.standard_normal(dim).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# Testing that compressed formats with exact re-scoring return the same neighbours and scores as float32, filters included
+def test_compressed_search_matches_flat():
+    vectors = _random_unit_vectors(500, 32)
+    metadata = [{"question": f"q{i}", "answer": "", "category": "transfers" if i % 2 else "data_use"} for i in range(500)]
+    query = vectors[7] + 0.01
+
+    flat = FAISSVectorStore(embedding_dim=32, compression="none")
+    flat.add_vectors(vectors, metadata)
+    expected = flat.search(query, top_k=3, filters={"category": "transfers"})
+
+    for compression, pca_dim in (("fp16", 0), ("int8", 0), ("int8", 16)):
+        store = FAISSVectorStore(embedding_dim=32, compression=compression, pca_dim=pca_dim, rescore_factor=20)
+        store.add_vectors(vectors, metadata)
+        assert store.is_compressed
+        results = store.search(query, top_k=3, filters={"category": "transfers"})
+        assert [r["faq"]["question"] for r in results] == [r["faq"]["question"] for r in expected]
+        assert abs(results[0]["similarity_score"] - expected[0]["similarity_score"]) < 1e-5
+
+    # Non-zero-mean data: PCA without re-scoring must still rank like float32 (the query is projected without centering)
+    vectors = _random_unit_vectors(2000, 32, seed=1, mean_offset=1.0, latent_dim=8)
+    metadata = [{"question": f"q{i}"} for i in range(2000)]
+    flat = FAISSVectorStore(embedding_dim=32, compression="none")
+    flat.add_vectors(vectors, metadata)
+    store = FAISSVectorStore(embedding_dim=32, compression="fp16", pca_dim=12, rescore_factor=1)
+    store.add_vectors(vectors, metadata)
+    for i in range(0, 2000, 100):
+        expected = flat.search(vectors[i], top_k=3)
+        results = store.search(vectors[i], top_k=3)
+        assert [r["faq"]["question"] for r in results] == [r["faq"]["question"] for r in expected]
+        # Scores without re-scoring must match float32 too, since they feed confidence scoring
+        for result, exact in zip(results, expected):
+            assert abs(result["similarity_score"] - exact["similarity_score"]) < 1e-2
+
+
+# Testing that PCA is skipped instead of failing when the corpus has fewer vectors than PCA dimensions
+def test_pca_skipped_for_small_corpus():
+    vectors = _random_unit_vectors(10, 32)
+    store = FAISSVectorStore(embedding_dim=32, compression="int8", pca_dim=16)
+    store.add_vectors(vectors, [{"question": f"q{i}"} for i in range(10)])
+    assert not isinstance(store.index, faiss.IndexPreTransform)
+    assert store.search(vectors[3], top_k=1)[0]["faq"]["question"] == "q3"
+
+
+# Testing that a compressed index and its re-scoring vectors survive a save/load round trip
+def test_compressed_index_round_trip(tmp_path, monkeypatch):
+    import embeddings.vector_store as vector_store_module
+    monkeypatch.setattr(vector_store_module, "FAISS_INDEX_PATH", tmp_path / "faqs.index")
+    monkeypatch.setattr(vector_store_module, "FAISS_METADATA_PATH", tmp_path / "metadata.json")
+    monkeypatch.setattr(vector_store_module, "FAISS_VECTORS_PATH", tmp_path / "vectors.npy")
+
+    vectors = _random_unit_vectors(200, 16)
+    store = FAISSVectorStore(embedding_dim=16, compression="int8")
+    store.add_vectors(vectors, [{"question": f"q{i}"} for i in range(200)])
+    store.save_index()
+
+    loaded = FAISSVectorStore(embedding_dim=16, compression="none")
+    loaded.load_index()
+    assert loaded.is_compressed
+    assert loaded.search(vectors[42], top_k=1)[0]["faq"]["question"] == "q42"
+    assert abs(loaded.search(vectors[42], top_k=1)[0]["similarity_score"] - 1.0) < 1e-5
+
+
+class _ClearedAfterLookup(dict):
+    # Selector cache that is emptied right after every lookup, as if another search thread cleared it in between
+    def __contains__(self, key):
+        found = super().__contains__(key)
+        self.clear()
+        return found
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        self.clear()
+        return value
+
+
+# Testing that a filtered search survives the selector cache being cleared by another thread mid-lookup
+def test_filtered_search_with_concurrently_cleared_cache():
+    store = _build_store()
+    store._selectors = _ClearedAfterLookup()
+    for _ in range(3):
+        results = store.search(np.array([1, 0, 0, 0], dtype='float32'), top_k=2, filters={"category": "transfers"})
+        assert results and all(r["faq"]["category"] == "transfers" for r in results)